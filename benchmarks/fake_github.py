@@ -0,0 +1,193 @@
+# Servidor falso da API REST do GitHub usado pelos benchmarks.
+# Cobre apenas os endpoints que tools/github_tool.py consulta, com dados
+# gerados de forma determinística e latência configurável por requisição.
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+DEFAULT_PER_PAGE = 30
+
+def _date(day: int) -> str:
+    return f"2024-{(day // 28) % 12 + 1:02d}-{day % 28 + 1:02d}T12:00:00Z"
+
+class FakeGithubData:
+    """Canned organization with repositories, issues, pull requests and a project"""
+
+    def __init__(self, org: str = "bench", repos: int = 20, issues: int = 50, pulls: int = 20,
+                 comments: int = 5, reviews: int = 3):
+        self.org = org
+        self.repo_names = [f"repo-{index}" for index in range(repos)]
+        self.issues = issues
+        self.pulls = pulls
+        self.comments = comments
+        self.reviews = reviews
+
+    def repo(self, base: str, name: str) -> Dict:
+        index = self.repo_names.index(name)
+        full_name = f"{self.org}/{name}"
+        return {
+            "id": index + 1,
+            "name": name,
+            "full_name": full_name,
+            "description": f"Synthetic repository {index}",
+            "stargazers_count": (index * 37) % 500,
+            "forks_count": index * 3,
+            "open_issues_count": self.issues,
+            "language": "Python",
+            "archived": index % 10 == 9,
+            "url": f"{base}/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}",
+            "owner": {"login": self.org, "url": f"{base}/users/{self.org}"},
+        }
+
+    def issue(self, base: str, name: str, number: int) -> Dict:
+        full_name = f"{self.org}/{name}"
+        return {
+            "id": number,
+            "number": number,
+            "title": f"Issue {number} in {name}",
+            "body": f"Description of issue {number}. " * 20,
+            "state": "open",
+            "created_at": _date(number),
+            "labels": [{"name": "bug", "url": f"{base}/repos/{full_name}/labels/bug"}],
+            "user": {"login": f"user{number % 7}"},
+            "pull_request": None,
+            "url": f"{base}/repos/{full_name}/issues/{number}",
+            "html_url": f"https://github.com/{full_name}/issues/{number}",
+        }
+
+    def pull(self, base: str, name: str, number: int) -> Dict:
+        full_name = f"{self.org}/{name}"
+        return {
+            "id": 10000 + number,
+            "number": number,
+            "title": f"Pull request {number} in {name}",
+            "state": "open",
+            "created_at": _date(number * 2),
+            "user": {"login": f"user{number % 5}"},
+            "head": {"ref": f"feature-{number}"},
+            "base": {"ref": "main"},
+            "url": f"{base}/repos/{full_name}/pulls/{number}",
+            "html_url": f"https://github.com/{full_name}/pull/{number}",
+        }
+
+    def route(self, base: str, path: str, query: Dict) -> Tuple[int, object]:
+        """Return (status, payload) for a GET request; lists are paginated by the handler"""
+        parts = [part for part in path.split('/') if part]
+        if parts[:1] == ["orgs"] and len(parts) >= 2 and parts[1] == self.org:
+            if len(parts) == 2:
+                return 200, {"login": self.org, "id": 1, "url": f"{base}/orgs/{self.org}"}
+            if parts[2] == "repos":
+                return 200, [self.repo(base, name) for name in self.repo_names]
+            if parts[2] == "projects":
+                return 200, [{"id": 1, "number": 1, "name": "Roadmap", "body": "Synthetic project",
+                              "url": f"{base}/projects/1", "columns_url": f"{base}/projects/1/columns"}]
+        if parts[:2] == ["projects", "1"] and parts[2:] == ["columns"]:
+            return 200, [{"id": column, "name": name, "url": f"{base}/projects/columns/{column}",
+                          "cards_url": f"{base}/projects/columns/{column}/cards"}
+                         for column, name in ((1, "Todo"), (2, "Doing"), (3, "Done"))]
+        if parts[:2] == ["projects", "columns"] and len(parts) == 4 and parts[3] == "cards":
+            return 200, [{"id": int(parts[2]) * 100 + card, "note": f"Card {card}", "content_url": None,
+                          "url": f"{base}/projects/columns/cards/{card}"} for card in range(8)]
+        if parts[:2] == ["search", "code"]:
+            items = []
+            for index, name in enumerate(self.repo_names[:10]):
+                file_path = f"src/module_{index}.py"
+                items.append({
+                    "name": f"module_{index}.py",
+                    "path": file_path,
+                    "sha": f"{index:040d}",
+                    "url": f"{base}/repos/{self.org}/{name}/contents/{file_path}",
+                    "html_url": f"https://github.com/{self.org}/{name}/blob/main/{file_path}",
+                    "repository": self.repo(base, name),
+                })
+            return 200, {"total_count": len(items), "incomplete_results": False, "items": items}
+        if parts[:1] == ["repos"] and len(parts) >= 3 and parts[1] == self.org and parts[2] in self.repo_names:
+            name, rest = parts[2], parts[3:]
+            if not rest:
+                return 200, self.repo(base, name)
+            if rest == ["topics"]:
+                return 200, {"names": ["benchmark", "synthetic"]}
+            if rest[0] == "contents":
+                content = "def handler(event):\n    return event\n" * 20
+                return 200, {"type": "file", "name": rest[-1], "path": "/".join(rest[1:]),
+                             "encoding": "base64", "content": base64.b64encode(content.encode()).decode(),
+                             "url": f"{base}{path}"}
+            if rest == ["issues"]:
+                return 200, [self.issue(base, name, number) for number in range(self.issues, 0, -1)]
+            if rest[0] == "issues" and len(rest) >= 2 and rest[1].isdigit():
+                number = int(rest[1])
+                if not 1 <= number <= self.issues:
+                    return 404, {"message": "Not Found"}
+                if rest[2:] == ["comments"]:
+                    return 200, [{"id": number * 100 + index, "body": f"Comment {index} on issue {number}",
+                                  "user": {"login": f"user{index}"}} for index in range(self.comments)]
+                return 200, self.issue(base, name, number)
+            if rest == ["pulls"]:
+                return 200, [self.pull(base, name, number) for number in range(self.pulls, 0, -1)]
+            if rest[0] == "pulls" and len(rest) == 3 and rest[2] == "reviews":
+                return 200, [{"id": index, "state": "APPROVED", "user": {"login": f"user{index}"}}
+                             for index in range(self.reviews)]
+        return 404, {"message": "Not Found"}
+
+class FakeGithubServer:
+    """Threaded HTTP server answering GitHub REST requests from FakeGithubData"""
+
+    def __init__(self, data: Optional[FakeGithubData] = None, latency: float = 0.0,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.data = data or FakeGithubData()
+        self.latency = latency
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                server.requests += 1
+                if server.latency:
+                    time.sleep(server.latency)
+                parsed = urlparse(self.path)
+                query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+                status, payload = server.data.route(server.url, parsed.path, query)
+                headers = {}
+                if isinstance(payload, list):
+                    payload, headers = server._paginate(parsed.path, query, payload)
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def _paginate(self, path: str, query: Dict, items: List) -> Tuple[List, Dict]:
+        per_page = int(query.get("per_page", DEFAULT_PER_PAGE))
+        page = int(query.get("page", 1))
+        last = max((len(items) + per_page - 1) // per_page, 1)
+        links = []
+        for rel, number in (("next", page + 1), ("last", last)):
+            if number <= last and (rel == "last" or page < last):
+                params = urlencode(dict(query, page=number, per_page=per_page))
+                links.append(f'<{self.url}{path}?{params}>; rel="{rel}"')
+        headers = {"Link": ", ".join(links)} if last > 1 else {}
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def start(self) -> "FakeGithubServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
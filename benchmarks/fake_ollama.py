@@ -0,0 +1,75 @@
+# Endpoint falso do Ollama (/api/chat) com latência e taxa de geração configuráveis
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class FakeOllamaServer:
+    """Answers /api/chat after latency + prompt and generation time at the configured rates"""
+
+    def __init__(self, latency: float = 0.05, tokens: int = 200, token_rate: float = 2000.0,
+                 prompt_rate: float = 20000.0, host: str = "127.0.0.1", port: int = 0):
+        self.latency = latency
+        self.tokens = tokens
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                # Usado pelo cliente para verificar a versão do servidor
+                self._send(200, {"version": "0.0.0-bench"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path.rstrip('/') != "/api/chat":
+                    self._send(404, {"error": "not found"})
+                    return
+                server.requests += 1
+                self._send(200, server.chat(request))
+
+            def _send(self, status: int, payload: dict):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def chat(self, request: dict) -> dict:
+        prompt = "".join(message.get("content", "") for message in request.get("messages", []))
+        prompt_tokens = max(len(prompt) // 4, 1)
+        prompt_seconds = prompt_tokens / self.prompt_rate if self.prompt_rate else 0
+        eval_seconds = self.tokens / self.token_rate if self.token_rate else 0
+        time.sleep(self.latency + prompt_seconds + eval_seconds)
+        content = " ".join(["analysis"] * self.tokens)
+        return {
+            "model": request.get("model", "codellama"),
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prompt_seconds * 1e9),
+            "eval_count": self.tokens,
+            "eval_duration": int(eval_seconds * 1e9),
+            "total_duration": int((self.latency + prompt_seconds + eval_seconds) * 1e9),
+        }
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,266 @@
+# Benchmarks das ferramentas em tools/ contra GitHub, Ollama e repositórios git locais.
+#
+#   python -m benchmarks.run                              # todos os grupos exceto memory
+#   python -m benchmarks.run --groups git --iterations 50
+#   python -m benchmarks.run --save-baseline benchmarks/baseline.json
+#   python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+#
+# O processo termina com código 1 quando algum cenário regride além do limite.
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .fake_github import FakeGithubData, FakeGithubServer
+from .fake_ollama import FakeOllamaServer
+from .synthetic_repo import create_repo
+
+# Métricas comparadas com o baseline e se valores maiores são piores
+COMPARED = {"p50_ms": True, "p95_ms": True, "throughput_per_s": False}
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of values"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+def build_scenarios(repo_info: Dict, org: str) -> List[Dict]:
+    """(group, name, coroutine factory) for every benchmarked tool call"""
+    from tools import git_tool, github_tool, doc_tool, review_tool, memory_tool
+
+    sample = repo_info["sample_file"]
+    large_file = Path(repo_info["path"], sample).read_text() * 20
+    repo = f"{org}/repo-0"
+    scenarios = [
+        ("git", "get_commit_history", lambda: git_tool.get_commit_history(20)),
+        ("git", "get_commit_history_filtered", lambda: git_tool.get_commit_history(20, author="Author 1", path="src/pkg_1")),
+        ("git", "get_file_history", lambda: git_tool.get_file_history(sample)),
+        ("git", "get_line_history", lambda: git_tool.get_line_history(sample, 1, 30)),
+        ("git", "get_repo_info", lambda: git_tool.get_repo_info()),
+        ("git", "get_diffs", lambda: git_tool.get_diffs()),
+        ("git", "get_diffs_stat", lambda: git_tool.get_diffs(stat_only=True)),
+        ("github", "get_repo_details", lambda: github_tool.get_repo_details(repo)),
+        ("github", "get_repository_issues", lambda: github_tool.get_repository_issues(repo)),
+        ("github", "get_pull_requests", lambda: github_tool.get_pull_requests(repo)),
+        ("github", "search_github_code", lambda: github_tool.search_github_code("handler")),
+        ("github", "get_project_info", lambda: github_tool.get_project_info(org, 1)),
+        ("github", "get_repos_details_batch", lambda: github_tool.get_repos_details_batch(org=org)),
+        ("github", "get_issues_batch", lambda: github_tool.get_issues_batch(org=org)),
+        ("github", "get_pull_requests_batch", lambda: github_tool.get_pull_requests_batch(org=org)),
+        ("ollama", "search_docs", lambda: doc_tool.search_docs("asyncio task groups")),
+        ("ollama", "analyze_file_content", lambda: github_tool.analyze_file_content(large_file, "python")),
+        ("ollama", "review_changes", lambda: review_tool.review_changes()),
+        ("memory", "add_memory", lambda: memory_tool.add_memory("Benchmark memory entry", "general")),
+        ("memory", "get_memory", lambda: memory_tool.get_memory("benchmark")),
+        ("memory", "summarize_issue", lambda: github_tool.summarize_issue(repo, 1)),
+    ]
+    return [{"group": group, "name": name, "factory": factory} for group, name, factory in scenarios]
+
+def is_error(result) -> bool:
+    """Tools report failures as strings instead of raising"""
+    return isinstance(result, str) and result.lstrip().lower().startswith(("erro", "error"))
+
+async def run_scenario(factory: Callable, iterations: int, concurrency: int,
+                       reset: Optional[Callable] = None) -> Dict:
+    """Measure sequential latency, throughput at the given concurrency and peak allocations"""
+    errors = 0
+
+    async def call():
+        nonlocal errors
+        if reset:
+            reset()
+        try:
+            if is_error(await factory()):
+                errors += 1
+        except Exception:
+            errors += 1
+
+    await call()  # Aquecimento: imports, clientes e caches de primeira chamada
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        await call()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await call()
+    await asyncio.gather(*(limited() for _ in range(iterations)))
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    await call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+        "throughput_per_s": iterations / elapsed if elapsed else 0.0,
+        "peak_alloc_kb": peak / 1024,
+        "errors": errors,
+    }
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Regressions of results against baseline beyond threshold (a fraction)"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_worse in COMPARED.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (change > threshold) if higher_is_worse else (change < -threshold):
+                regressions.append(f"{name}: {metric} {old:.1f} → {new:.1f} ({change:+.0%})")
+    return regressions
+
+def print_report(results: Dict, baseline: Optional[Dict]) -> None:
+    header = f"{'scenario':<32} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8} {'peak KB':>9} {'err':>4}"
+    if baseline:
+        header += f" {'Δp50':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, data in results["scenarios"].items():
+        line = (f"{name:<32} {data['p50_ms']:9.1f} {data['p95_ms']:9.1f} {data['p99_ms']:9.1f} "
+                f"{data['throughput_per_s']:8.1f} {data['peak_alloc_kb']:9.0f} {data['errors']:>4}")
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous and previous.get("p50_ms"):
+            line += f" {(data['p50_ms'] - previous['p50_ms']) / previous['p50_ms']:+7.0%}"
+        print(line)
+    print(f"\nmax RSS: {results['meta']['max_rss_mb']:.1f} MB")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmarks das ferramentas do MCP Dev Agent")
+    parser.add_argument("--groups", default="git,github,ollama",
+                        help="Grupos a executar: git, github, ollama, memory (padrão: git,github,ollama)")
+    parser.add_argument("--scenarios", default=None, help="Executar apenas estes cenários (separados por vírgula)")
+    parser.add_argument("--iterations", type=int, default=20, help="Chamadas medidas por cenário")
+    parser.add_argument("--concurrency", type=int, default=8, help="Chamadas simultâneas na medição de throughput")
+    parser.add_argument("--repo-files", type=int, default=200, help="Arquivos no repositório sintético")
+    parser.add_argument("--repo-commits", type=int, default=500, help="Commits no repositório sintético")
+    parser.add_argument("--repo-modified", type=int, default=20, help="Arquivos com mudanças pendentes")
+    parser.add_argument("--github-repos", type=int, default=20, help="Repositórios na organização falsa")
+    parser.add_argument("--github-latency", type=float, default=0.02, help="Latência (s) de cada requisição ao GitHub falso")
+    parser.add_argument("--ollama-latency", type=float, default=0.05, help="Latência fixa (s) do Ollama falso")
+    parser.add_argument("--ollama-tokens", type=int, default=200, help="Tokens gerados por resposta")
+    parser.add_argument("--ollama-token-rate", type=float, default=2000.0, help="Tokens gerados por segundo")
+    parser.add_argument("--cold", action="store_true", help="Limpar os caches em disco antes de cada chamada")
+    parser.add_argument("--output", default=None, help="Gravar os resultados em JSON neste arquivo")
+    parser.add_argument("--baseline", default=None, help="Comparar com resultados gravados anteriormente")
+    parser.add_argument("--save-baseline", default=None, help="Gravar os resultados como novo baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regressão tolerada (fração, padrão 0.2 = 20%%)")
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    groups = set(args.groups.split(","))
+    selected = set(args.scenarios.split(",")) if args.scenarios else None
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    github = FakeGithubServer(FakeGithubData(repos=args.github_repos), latency=args.github_latency).start()
+    ollama = FakeOllamaServer(args.ollama_latency, args.ollama_tokens, args.ollama_token_rate).start()
+    workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+    original_cwd = os.getcwd()
+    try:
+        print(f"⏳ Criando repositório sintético ({args.repo_files} arquivos, {args.repo_commits} commits)...")
+        repo_info = create_repo(workdir / "repo", files=args.repo_files, commits=args.repo_commits,
+                                modified=args.repo_modified)
+        repo_path = Path(repo_info["path"])
+        cache_dir = workdir / "cache"
+        with open(repo_path / ".agent.json", "w", encoding="utf-8") as f:
+            json.dump({"cache": {"enabled": True, "directory": str(cache_dir), "max_age": 0}}, f)
+        with open(repo_path / ".git" / "info" / "exclude", "a", encoding="utf-8") as f:
+            f.write(".agent.json\n")
+
+        # Antes de importar tools/: os clientes leem estas variáveis na criação
+        os.environ.update({
+            "GITHUB_TOKEN": "bench-token",
+            "GITHUB_API_URL": github.url,
+            "OLLAMA_HOST": ollama.url,
+            "MCP_DEV_AGENT_MEMORY_DIR": str(workdir / "chroma"),
+        })
+        os.chdir(repo_path)
+        sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+        def reset():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        results = {"meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "args": {key: value for key, value in vars(args).items()
+                     if key not in ("output", "baseline", "save_baseline")},
+        }, "scenarios": {}}
+        for scenario in build_scenarios(repo_info, "bench"):
+            if scenario["group"] not in groups or (selected and scenario["name"] not in selected):
+                continue
+            print(f"▶ {scenario['group']}/{scenario['name']}", file=sys.stderr)
+            with open(os.devnull, "w") as devnull:
+                # As ferramentas imprimem progresso; não misturar com o relatório
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    results["scenarios"][scenario["name"]] = asyncio.run(run_scenario(
+                        scenario["factory"], args.iterations, args.concurrency, reset if args.cold else None))
+                finally:
+                    sys.stdout = stdout
+        # ru_maxrss é em KB no Linux e em bytes no macOS
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["meta"]["max_rss_mb"] = max_rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+        results["meta"]["github_requests"] = github.requests
+        results["meta"]["ollama_requests"] = ollama.requests
+    finally:
+        os.chdir(original_cwd)
+        github.stop()
+        ollama.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results, baseline)
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Resultados gravados em {path}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regressões acima de {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\n✅ Nenhuma regressão acima de {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
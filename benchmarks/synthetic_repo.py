@@ -0,0 +1,79 @@
+# Geração de repositórios git sintéticos e reproduzíveis para os benchmarks
+import random
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+BASE_TIMESTAMP = 1700000000
+
+def _module(index: int, functions: int, revision: int = 0) -> str:
+    lines = [f'"""Synthetic module {index}"""', "import os", ""]
+    for function in range(functions):
+        lines += [
+            f"def function_{index}_{function}(value):",
+            f'    """Function {function} (revision {revision if function == 0 else 0})"""',
+            f"    result = value * {function + 1} + {revision if function == 0 else 0}",
+            "    if result > 100:",
+            "        return os.path.join(str(result), 'out')",
+            "    return result",
+            "",
+        ]
+    lines += [f"class Handler{index}:", "    def run(self, value):",
+              f"        return function_{index}_0(value)", ""]
+    return "\n".join(lines)
+
+def _data(text: str) -> bytes:
+    payload = text.encode('utf-8')
+    return b"data %d\n" % len(payload) + payload + b"\n"
+
+def create_repo(path: Path, files: int = 200, commits: int = 500, functions: int = 10,
+                modified: int = 20, untracked: int = 5, seed: int = 0) -> Dict:
+    """Create a repository with history and pending changes at path.
+
+    History is written with `git fast-import`, so large repositories are
+    generated in seconds. Returns a description of what was generated.
+    """
+    rng = random.Random(seed)
+    path.mkdir(parents=True, exist_ok=True)
+    subprocess.run(["git", "init", "-q", "-b", "main", str(path)], check=True)
+    subprocess.run(["git", "-C", str(path), "config", "user.email", "bench@example.com"], check=True)
+    subprocess.run(["git", "-C", str(path), "config", "user.name", "Bench"], check=True)
+
+    revisions = [0] * files
+    names = [f"src/pkg_{index % 10}/module_{index}.py" for index in range(files)]
+    authors = [f"Author {index} <author{index}@example.com>" for index in range(5)]
+    stream: List[bytes] = []
+    for number in range(1, commits + 1):
+        if number == 1:
+            changed = list(range(files))
+        else:
+            changed = rng.sample(range(files), k=min(files, rng.randint(1, 3)))
+        author = authors[number % len(authors)]
+        timestamp = BASE_TIMESTAMP + number * 3600
+        stream.append(b"commit refs/heads/main\n")
+        stream.append(b"mark :%d\n" % number)
+        stream.append(f"author {author} {timestamp} +0000\n".encode())
+        stream.append(f"committer {author} {timestamp} +0000\n".encode())
+        stream.append(_data(f"Commit {number}: update {len(changed)} files"))
+        if number > 1:
+            stream.append(b"from :%d\n" % (number - 1))
+        for index in changed:
+            revisions[index] += 1
+            stream.append(f"M 100644 inline {names[index]}\n".encode())
+            stream.append(_data(_module(index, functions, revisions[index])))
+        stream.append(b"\n")
+    subprocess.run(["git", "-C", str(path), "fast-import", "--quiet"], input=b"".join(stream), check=True)
+    subprocess.run(["git", "-C", str(path), "checkout", "-q", "-f", "main"], check=True)
+
+    # Mudanças pendentes: metade staged, metade apenas no working tree
+    pending = rng.sample(range(files), k=min(files, modified))
+    for position, index in enumerate(pending):
+        file_path = path / names[index]
+        file_path.write_text(_module(index, functions, revisions[index] + 1) + "\n# pending change\n")
+        if position % 2 == 0:
+            subprocess.run(["git", "-C", str(path), "add", names[index]], check=True)
+    for index in range(untracked):
+        (path / f"untracked_{index}.py").write_text(_module(files + index, functions))
+
+    return {"path": str(path), "files": files, "commits": commits, "functions": functions,
+            "modified": len(pending), "untracked": untracked, "sample_file": names[0]}
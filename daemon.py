@@ -0,0 +1,152 @@
+# Daemon local que mantém um processo do agente "aquecido" por projeto.
+# Usa apenas a biblioteca padrão para que o cliente em mcp_cli.py não pague
+# o custo de inicialização do agente. Protocolo: JSON por linha sobre um
+# socket Unix; requisições {"action", "command", "width"} e respostas
+# {"output", "ask_continue"}.
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IDLE_TIMEOUT = 1800
+# Tempo máximo de espera para o daemon começar a aceitar conexões
+STARTUP_TIMEOUT = 30
+
+def is_supported() -> bool:
+    """Unix sockets are required; on other platforms the CLI runs in-process"""
+    return hasattr(socket, 'AF_UNIX') and os.name != 'nt'
+
+def socket_path(project_dir: Path) -> Path:
+    """Socket used by the daemon serving project_dir"""
+    key = hashlib.sha256(str(Path(project_dir).resolve()).encode('utf-8')).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"mcp-dev-agent-{os.getuid()}-{key}.sock"
+
+def acquire_lock(path: Path) -> Optional[int]:
+    """Take the lock file next to the socket; None if another daemon holds it"""
+    import fcntl
+
+    fd = os.open(str(path.with_suffix('.lock')), os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+class DaemonClient:
+    """Blocking client used by mcp_cli.py"""
+
+    def __init__(self, path: Path):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(path))
+        self.reader = self.sock.makefile('r', encoding='utf-8')
+
+    def request(self, action: str, command: str = "", width: int = 80) -> Dict:
+        payload = json.dumps({"action": action, "command": command, "width": width})
+        self.sock.sendall(payload.encode('utf-8') + b'\n')
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+def connect(path: Path, timeout: float = 0) -> Optional[DaemonClient]:
+    """Connect to a running daemon, retrying for up to timeout seconds"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return DaemonClient(path)
+        except OSError:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(0.1)
+
+Handler = Callable[[Dict], Awaitable[Dict]]
+
+async def serve(path: Path, handler: Handler, idle_timeout: int = DEFAULT_IDLE_TIMEOUT) -> None:
+    """Serve requests on a Unix socket until idle for idle_timeout seconds.
+
+    The lock file is held for the daemon's whole life, so two daemons
+    started at the same time never bind (or later unlink) each other's socket.
+    """
+    lock_fd = acquire_lock(path)
+    if lock_fd is None:
+        logger.info(f"Daemon already running or starting on {path}")
+        return
+    try:
+        await _serve(path, handler, idle_timeout)
+    finally:
+        os.close(lock_fd)  # Libera o lock
+
+async def _serve(path: Path, handler: Handler, idle_timeout: int) -> None:
+    if path.exists():
+        client = connect(path)
+        if client:
+            client.close()
+            logger.info(f"Daemon already running on {path}")
+            return
+        # Só remover depois que a conexão falhou: socket órfão de um daemon encerrado
+        path.unlink()
+
+    state = {"last_activity": time.monotonic(), "connections": 0}
+    stop = asyncio.Event()
+    # Comandos capturam stdout do processo, então são executados um por vez
+    lock = asyncio.Lock()
+
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        state["connections"] += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                state["last_activity"] = time.monotonic()
+                try:
+                    request = json.loads(line)
+                    if request.get("action") == "shutdown":
+                        stop.set()
+                        response = {"output": "", "ask_continue": False}
+                    else:
+                        async with lock:
+                            response = await handler(request)
+                except Exception as e:
+                    logger.error(f"Error handling daemon request: {e}")
+                    response = {"output": f"Erro: {str(e)}\n", "ask_continue": False}
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+                state["last_activity"] = time.monotonic()
+        finally:
+            state["connections"] -= 1
+            writer.close()
+
+    server = await asyncio.start_unix_server(handle_connection, path=str(path))
+    os.chmod(path, 0o600)
+    logger.info(f"Daemon listening on {path} (idle timeout {idle_timeout}s)")
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=min(idle_timeout, 30))
+                break
+            except asyncio.TimeoutError:
+                pass
+            idle = time.monotonic() - state["last_activity"]
+            if state["connections"] == 0 and idle >= idle_timeout:
+                logger.info("Daemon idle, shutting down")
+                break
+    finally:
+        server.close()
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -1,52 +1,132 @@
+import time
+
+# Marcar o início do processo antes de qualquer import para o relatório --timings
+PROCESS_START = time.perf_counter()
+
 from datetime import datetime
-from mcp.server.fastmcp import FastMCP
-from tools.memory_tool import add_memory, get_memory, add_repo_memory, get_repo_memory
+from tools.memory_tool import add_memory, get_memory, add_repo_memory, get_repo_memory, get_collection
 from tools.doc_tool import search_docs
-from tools.git_tool import get_commit_history, get_issues, get_repo_info, get_diffs
+from tools.git_tool import (
+    GitTool, get_repo, get_commit_history, get_issues, get_repo_info, get_diffs, get_repo_status,
+    get_file_history, get_line_history,
+    format_file_diff, format_diff_page_footer
+)
+from tools.review_tool import review_changes
+from tools.code_index import get_code_index, search_code_local
+from tools.config import load_agent_config as load_tool_config
+from tools.singleflight import SingleFlight
+from tools.metrics import REGISTRY, instrument_tool
+from tools import profiling
+from tools.logging_config import configure_logging
 from tools.github_tool import (
-    get_repo_details, get_repository_issues, analyze_file_content, search_github_code,
-    get_pull_requests, get_project_info, summarize_issue
+    get_github_client, get_repo_details, get_repository_issues, analyze_file_content, search_github_code,
+    get_pull_requests, get_project_info, summarize_issue,
+    get_repos_details_batch, get_issues_batch, get_pull_requests_batch
 )
 import argparse
 import asyncio
+import contextlib
+import io
 import json
 import os
 import sys
+import threading
 import logging
 from pathlib import Path
 from dotenv import load_dotenv
 import uuid
-import git
-from rich.console import Console
-from rich.panel import Panel
-from rich.box import SQUARE
-from rich.text import Text
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
-console = Console()
+# Dependências pesadas carregadas sob demanda; usadas no relatório --timings
+HEAVY_MODULES = ['chromadb', 'github', 'ollama', 'tree_sitter', 'git', 'rich', 'mcp']
+
+_console = None
+
+def get_console():
+    """Create the rich console on first use"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
+
+class StartupTimer:
+    """Collect elapsed time per startup phase for the --timings report"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.last = PROCESS_START
+        self.phases = []
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.last))
+        self.last = now
+
+    def report(self):
+        if not self.enabled:
+            return
+        print("⏱  Startup timings:")
+        for phase, elapsed in self.phases:
+            print(f"   {phase:<24} {elapsed * 1000:8.1f} ms")
+        print(f"   {'total':<24} {(self.last - PROCESS_START) * 1000:8.1f} ms")
+        print()
+
+def loaded_heavy_modules():
+    """Names of heavy dependencies already imported in this process"""
+    return {name for name in HEAVY_MODULES if name in sys.modules}
 
 def print_result(result):
     """Print command result with border"""
+    from rich.panel import Panel
+    from rich.box import SQUARE
+
+    console = get_console()
     if result:
         if isinstance(result, (list, dict)):
             result = json.dumps(result, indent=2, ensure_ascii=False)
         console.print(Panel(str(result), box=SQUARE))
     console.print()
 
+def print_diffs(cursor: int = 0, stat_only: bool = False):
+    """Render pending diffs file by file as they are read"""
+    from rich.panel import Panel
+    from rich.box import SQUARE
+
+    console = get_console()
+    tool = GitTool()
+    files = tool.list_changed_files()
+    if not files:
+        print_result("No changes found")
+        return
+    shown = 0
+    for diff in tool.iter_file_diffs(cursor, stat_only=stat_only, files=files):
+        console.print(Panel(format_file_diff(diff), box=SQUARE))
+        shown += 1
+    console.print(format_diff_page_footer(shown, cursor, len(files)), style="dim")
+    console.print()
+
 def get_git_info():
     """Get git branch and status"""
     try:
-        repo = git.Repo(os.getcwd())
-        branch = repo.active_branch.name
-        changes = len(repo.index.diff(None)) + len(repo.untracked_files)
+        status = get_repo_status()
+        if not status:
+            return ""
+        branch = status['branch']
+        changes = status['modified'] + status['untracked']
         return f"git:({branch})±{changes}" if changes > 0 else f"git:({branch})"
     except:
         return ""
 
 def print_cli_header():
     """Print CLI header with rich formatting"""
+    from rich.panel import Panel
+    from rich.box import SQUARE
+    from rich.text import Text
+
+    console = get_console()
     # Get virtual env name
     venv = os.environ.get('VIRTUAL_ENV')
     if venv:
@@ -89,10 +169,15 @@ def print_help():
   /memory repo get <consulta>    - Buscar memórias do repositório
 
 🔄 Comandos Git:
-  /git commits [número]          - Mostrar histórico de commits (padrão: últimos 5)
+  /git commits [número] [filtros] - Mostrar histórico de commits (padrão: últimos 5)
+                                   filtros: cursor=<c> path=<p> author=<a> since=<data> until=<data>
+  /git history <path> [número]   - Commits que alteraram um arquivo ou diretório
+  /git blame <path> <ini> <fim>  - Commits que alteraram por último cada linha do intervalo
   /git issues                    - Listar issues do repositório local
   /git info                      - Mostrar informações detalhadas do repositório
-  /git diff                      - Mostrar mudanças pendentes (staged e unstaged)
+  /git diff [--stat] [cursor]    - Mostrar mudanças pendentes (staged e unstaged), paginadas
+  /git review [escopo|range]     - Revisar com IA apenas os trechos alterados
+                                   (escopo: all/staged/unstaged ou range: main..HEAD)
 
 🌐 Comandos GitHub:
   /github repo <owner/repo>      - Mostrar detalhes do repositório
@@ -101,12 +186,19 @@ def print_help():
   /github project <org> <number> - Mostrar informações do projeto
   /github summarize <owner/repo> - Gerar resumo da issue usando GPT
   /github search <query>         - Buscar código no GitHub
+  /github batch <repo|issues|prs> <alvos> [state]
+                                 - Consultar vários repositórios em paralelo
+                                   (alvos: owner/a,owner/b ou org:<org>[:<filtro>])
 
 💻 Análise de Código e Documentação:
   /code analyze <file>           - Analisar estrutura do código
+  /code search <consulta>        - Busca semântica no código do repositório local
+  /code index                    - Atualizar agora o índice do código local
   /docs <query>                  - Buscar documentação
 
 ⚡ Outros Comandos:
+  /stats                         - Mostrar latência por ferramenta, caches e tokens da sessão
+  /profile [on|off]              - Gravar perfil (cProfile) e trace de cada comando em logs/profiles
   /help                          - Mostrar esta mensagem de ajuda
   exit                           - Sair do CLI
 """
@@ -131,222 +223,426 @@ def load_agent_config():
     return config
 
 def setup_logging():
-    """Configure logging to use current directory"""
-    current_dir = Path.cwd()
-    log_file = current_dir / 'logs' / 'agent.log'
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file),
-            logging.StreamHandler()
-        ]
-    )
-
-config = load_agent_config()
-mcp = FastMCP("pair_programming_agent", config=config)
-
-# Registro das ferramentas de memória
-mcp.add_tool(add_memory)
-mcp.add_tool(get_memory)
-mcp.add_tool(add_repo_memory)
-mcp.add_tool(get_repo_memory)
-
-# Registro das ferramentas de documentação
-mcp.add_tool(search_docs)
-
-# Registro das ferramentas Git e GitHub
-mcp.add_tool(get_commit_history)
-mcp.add_tool(get_issues)
-mcp.add_tool(get_repo_info)
-mcp.add_tool(get_diffs)
-mcp.add_tool(get_repo_details)
-mcp.add_tool(get_repository_issues)
-mcp.add_tool(analyze_file_content)
-mcp.add_tool(search_github_code)
-mcp.add_tool(get_pull_requests)
-mcp.add_tool(get_project_info)
-mcp.add_tool(summarize_issue)
-
-async def cli_interaction():
+    """Configure queue-based logging from the `logging` section of .agent.json"""
+    return configure_logging(load_tool_config().get('logging', {}))
+
+# Ferramentas expostas pelo servidor MCP
+TOOLS = [
+    # Memória
+    add_memory,
+    get_memory,
+    add_repo_memory,
+    get_repo_memory,
+    # Documentação e código local
+    search_docs,
+    search_code_local,
+    # Git e GitHub
+    get_commit_history,
+    get_file_history,
+    get_line_history,
+    get_issues,
+    get_repo_info,
+    get_diffs,
+    review_changes,
+    get_repo_details,
+    get_repository_issues,
+    analyze_file_content,
+    search_github_code,
+    get_pull_requests,
+    get_project_info,
+    summarize_issue,
+    get_repos_details_batch,
+    get_issues_batch,
+    get_pull_requests_batch,
+]
+
+# Ferramentas que nunca vão para os workers: o índice do código tem um único
+# processo dono (um PersistentClient do chromadb por processo não é seguro)
+IN_PROCESS_TOOLS = {search_code_local}
+
+def create_server(worker_pool=None, single_flight=None):
+    """Load the agent configuration and build the FastMCP server with all tools registered.
+
+    With a worker pool, every tool call runs in one of the pool's processes.
+    With single_flight, tools listed in `server.coalesce` share one execution
+    among identical concurrent calls. Every tool records its latency in the
+    metrics registry, coalesced calls included. When profiling is enabled,
+    each call writes a profile and span trace (inside the worker, if any).
+    """
+    from mcp.server.fastmcp import FastMCP
+
+    config = load_agent_config()
+    coalesced = set(config.get('server', {}).get('coalesce', [])) if single_flight else set()
+    mcp = FastMCP("pair_programming_agent", config=config)
+    for tool in TOOLS:
+        if worker_pool and tool not in IN_PROCESS_TOOLS:
+            registered = worker_pool.wrap(tool)
+        else:
+            registered = profiling.profile_tool(tool)
+        if tool.__name__ in coalesced:
+            registered = single_flight.wrap(registered)
+        mcp.add_tool(instrument_tool(registered))
+    return mcp
+
+def run_sse_server(mcp, worker_pool=None, drain_timeout: float = 30, graceful_timeout: float = 5):
+    """Serve the MCP SSE app plus a Prometheus /metrics endpoint.
+
+    On shutdown new tool calls are refused and in-flight calls get up to
+    drain_timeout seconds to finish while the SSE streams are still open,
+    so their results reach the clients. Only then are the streams given
+    graceful_timeout seconds to close and the workers stopped.
+    """
+    import uvicorn
+    from starlette.responses import PlainTextResponse
+
+    async def metrics(request):
+        return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    app = mcp.sse_app()
+    app.add_route("/metrics", metrics, methods=["GET"])
+
+    inner_lifespan = app.router.lifespan_context
+
+    @contextlib.asynccontextmanager
+    async def lifespan(lifespan_app):
+        async with inner_lifespan(lifespan_app) as state:
+            try:
+                yield state
+            finally:
+                if worker_pool:
+                    # As chamadas já tiveram drain_timeout antes de os streams fecharem
+                    await worker_pool.drain(0 if worker_pool.draining else drain_timeout)
+
+    class DrainingServer(uvicorn.Server):
+        async def shutdown(self, sockets=None):
+            if worker_pool:
+                await worker_pool.wait_in_flight(drain_timeout)
+            await super().shutdown(sockets=sockets)
+
+    app.router.lifespan_context = lifespan
+    config = uvicorn.Config(app, host=mcp.settings.host, port=mcp.settings.port,
+                            log_level=mcp.settings.log_level.lower(), timeout_graceful_shutdown=graceful_timeout)
+    DrainingServer(config).run()
+
+def start_shared_memory():
+    """Serve the memory store from one chromadb server for the server and its workers.
+
+    Returns the server process to stop on shutdown, or None when `memory.host`
+    already points to a server.
+    """
+    from tools.cache import cache_directory
+    from tools.memory_tool import start_memory_server
+
+    memory_settings = load_tool_config().get('memory', {})
+    if memory_settings.get('host') or os.getenv('MCP_DEV_AGENT_MEMORY_HOST'):
+        return None
+    # Um PersistentClient por processo não enxerga as escritas dos outros
+    path = (os.getenv('MCP_DEV_AGENT_MEMORY_DIR') or memory_settings.get('persist_directory')
+            or str(cache_directory() / 'chroma'))
+    process, port = start_memory_server(path)
+    # Workers são criados depois e herdam estas variáveis
+    os.environ['MCP_DEV_AGENT_MEMORY_HOST'] = '127.0.0.1'
+    os.environ['MCP_DEV_AGENT_MEMORY_PORT'] = str(port)
+    logging.getLogger(__name__).info(f"Memory store served by a local ChromaDB server on port {port}")
+    return process
+
+def create_worker_pool(workers: int):
+    """Start the tool worker processes"""
+    from tools.workers import WorkerPool
+
+    return WorkerPool(workers, load_tool_config().get('logging', {}))
+
+async def handle_command(command: str) -> bool:
+    """Run one CLI command, printing its result and recording its latency.
+
+    Returns True when the CLI should ask whether to keep iterating.
+    """
+    parts = command[1:].split() if command.startswith('/') else []
+    if not parts:
+        return await _dispatch_command(command)
+    # Comando e subcomando (ex.: "git diff"), sem os argumentos livres
+    name = ' '.join(parts[:2]) if len(parts) > 1 and parts[0] in ('git', 'github', 'memory', 'code') else parts[0]
+    start = time.perf_counter()
+    trace = None
+    try:
+        with profiling.profile("command", name) as trace:
+            return await _dispatch_command(command)
+    finally:
+        REGISTRY.observe("mcp_command_duration_seconds", time.perf_counter() - start, command=name)
+        if trace and trace.files:
+            print(f"📊 Perfil gravado: {', '.join(str(path) for path in trace.files)}")
+
+async def _dispatch_command(command: str) -> bool:
+    if command.startswith('/'):
+        parts = command[1:].split()
+        if not parts:
+            return False
+
+        if parts[0] == 'help':
+            print_help()
+            return False
+
+        if parts[0] == 'stats':
+            print(REGISTRY.render_summary())
+            return False
+
+        if parts[0] == 'profile':
+            if len(parts) > 1 and parts[1] in ('on', 'off'):
+                profiling.set_enabled(parts[1] == 'on')
+            state = "ativado" if profiling.is_enabled() else "desativado"
+            print(f"Profiling {state}. Perfis são gravados em {profiling.output_directory()}")
+            return False
+
+        if parts[0] == 'docs':
+            if len(parts) < 2:
+                print("Uso: /docs <consulta>")
+                return False
+            query = ' '.join(parts[1:])
+            result = await search_docs(query)
+            print_result(result)
+            return False
+
+        elif parts[0] == 'git':
+            if len(parts) < 2:
+                print("Uso: /git [commits|history|blame|issues|info|diff|review]")
+                return False
+            if parts[1] == 'commits':
+                limit = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else 5
+                filters = dict(arg.split('=', 1) for arg in parts[2:] if '=' in arg)
+                result = await get_commit_history(
+                    limit,
+                    cursor=filters.get('cursor'),
+                    path=filters.get('path'),
+                    author=filters.get('author'),
+                    since=filters.get('since'),
+                    until=filters.get('until')
+                )
+                print_result(result)
+                return False
+            elif parts[1] == 'history':
+                if len(parts) < 3:
+                    print("Uso: /git history <path> [número]")
+                    return False
+                limit = int(parts[3]) if len(parts) > 3 else 10
+                result = await get_file_history(parts[2], limit)
+                print_result(result)
+                return False
+            elif parts[1] == 'blame':
+                if len(parts) < 5:
+                    print("Uso: /git blame <path> <linha_inicial> <linha_final>")
+                    return False
+                result = await get_line_history(parts[2], int(parts[3]), int(parts[4]))
+                print_result(result)
+                return False
+            elif parts[1] == 'issues':
+                result = await get_issues()
+                print_result(result)
+                return False
+            elif parts[1] == 'info':
+                result = await get_repo_info()
+                print_result(result)
+                return False
+            elif parts[1] == 'diff':
+                stat_only = '--stat' in parts[2:]
+                cursor_args = [arg for arg in parts[2:] if arg != '--stat']
+                print_diffs(int(cursor_args[0]) if cursor_args else 0, stat_only)
+                return False
+            elif parts[1] == 'review':
+                target = parts[2] if len(parts) > 2 else 'all'
+                if '..' in target:
+                    result = await review_changes(commit_range=target)
+                else:
+                    result = await review_changes(scope=target)
+                print_result(result)
+                return False
+
+        elif parts[0] == 'memory':
+            if len(parts) < 2:
+                print("Uso: /memory [add|get|repo] <conteúdo>")
+                return False
+
+            if parts[1] == 'repo':
+                if len(parts) < 3:
+                    print("Uso: /memory repo [add|get] <conteúdo>")
+                    return False
+
+                if parts[2] == 'add':
+                    content = ' '.join(parts[3:])
+                    # Obter contexto do git antes de adicionar memória
+                    git_info = await get_repo_info()
+                    git_context = {}
+                    for line in git_info.split('\n'):
+                        if line.startswith('Branch:'):
+                            git_context['branch'] = line.split(': ')[1]
+                        elif line.startswith('Last Commit:'):
+                            git_context['last_commit'] = line.split(': ')[1].split(' ')[0]
+                    result = await add_repo_memory(content, git_context)
+                    print_result(result)
+                    return False
+                elif parts[2] == 'get':
+                    query = ' '.join(parts[3:])
+                    result = await get_repo_memory(query)
+                    print_result(result)
+                    return False
+            elif parts[1] == 'add':
+                content = ' '.join(parts[2:])
+                result = await add_memory(content)
+                print_result(result)
+                return False
+            elif parts[1] == 'get':
+                query = ' '.join(parts[2:])
+                result = await get_memory(query)
+                print_result(result)
+                return False
+
+        elif parts[0] == 'github':
+            if len(parts) < 3:
+                print("Uso: /github [repo|issues|prs|project|summarize|search|batch] <args>")
+                return False
+
+            if parts[1] == 'batch':
+                if len(parts) < 4 or parts[2] not in ('repo', 'issues', 'prs'):
+                    print("Uso: /github batch <repo|issues|prs> <owner/a,owner/b | org:<org>[:<filtro>]> [state]")
+                    return False
+                targets = {}
+                if parts[3].startswith('org:'):
+                    org, _, repo_filter = parts[3][4:].partition(':')
+                    targets = {"org": org, "repo_filter": repo_filter or None}
+                else:
+                    targets = {"repo_names": [name for name in parts[3].split(',') if name]}
+                state = parts[4] if len(parts) > 4 else 'open'
+                if parts[2] == 'repo':
+                    result = await get_repos_details_batch(**targets)
+                elif parts[2] == 'issues':
+                    result = await get_issues_batch(**targets, state=state)
+                else:
+                    result = await get_pull_requests_batch(**targets, state=state)
+                print_result(result)
+                return False
+            elif parts[1] == 'repo':
+                result = await get_repo_details(parts[2])
+                print_result(result)
+                return False
+            elif parts[1] == 'issues':
+                state = parts[3] if len(parts) > 3 else 'open'
+                result = await get_repository_issues(parts[2], state)
+                print_result(result)
+                return False
+            elif parts[1] == 'prs':
+                state = parts[3] if len(parts) > 3 else 'open'
+                result = await get_pull_requests(parts[2], state)
+                print_result(result)
+                return False
+            elif parts[1] == 'project':
+                if len(parts) < 4:
+                    print("Uso: /github project <org> <number>")
+                    return False
+                result = await get_project_info(parts[2], int(parts[3]))
+                print_result(result)
+                return False
+            elif parts[1] == 'summarize':
+                if len(parts) < 4:
+                    print("Uso: /github summarize <owner/repo> <issue_number>")
+                    return False
+                result = await summarize_issue(parts[2], int(parts[3]))
+                print_result(result)
+                return False
+            elif parts[1] == 'search':
+                query = ' '.join(parts[2:])
+                language = None
+                if ' in:' in query:
+                    query, language = query.split(' in:', 1)
+                result = await search_github_code(query, language)
+
+            # Salvar automaticamente na memória resultados relevantes
+            if parts[1] in ['summarize', 'project']:
+                await add_memory(
+                    result,
+                    context_type=f"github_{parts[1]}",
+                    metadata={"command": command, "timestamp": datetime.now().isoformat()}
+                )
+
+        elif parts[0] == 'code':
+            if len(parts) == 2 and parts[1] == 'index':
+                index = get_code_index()
+                if index is None:
+                    print_result("Nenhum repositório git encontrado")
+                    return False
+                print("⏳ Indexando arquivos alterados...")
+                counts = await asyncio.to_thread(index.update)
+                if counts.get('busy'):
+                    print_result("Outro processo está atualizando o índice; tente novamente em instantes")
+                    return False
+                print_result(f"Índice atualizado: {counts['embedded']} arquivos indexados, "
+                             f"{counts['removed']} removidos, {counts['files']} no total")
+                return False
+
+            if len(parts) < 3:
+                print("Uso: /code [analyze <file> [language]|search <consulta>|index]")
+                return False
+
+            if parts[1] == 'search':
+                result = await search_code_local(' '.join(parts[2:]))
+                print_result(result)
+                return False
+
+            if parts[1] == 'analyze':
+                file_path = parts[2]
+                language = parts[3] if len(parts) > 3 else None
+
+                try:
+                    with open(file_path, 'r') as f:
+                        content = f.read()
+
+                    # Inferir linguagem do arquivo se não especificada
+                    if not language:
+                        if file_path.endswith('.py'):
+                            language = 'python'
+                        elif file_path.endswith('.js'):
+                            language = 'javascript'
+                        elif file_path.endswith('.ts'):
+                            language = 'typescript'
+                        else:
+                            language = 'python'  # default
+
+                    result = await analyze_file_content(content, language)
+                except FileNotFoundError:
+                    result = f"Erro: Arquivo '{file_path}' não encontrado"
+                except Exception as e:
+                    result = f"Erro ao analisar arquivo: {str(e)}"
+                print_result(result)
+                return False
+            else:
+                result = "Subcomando desconhecido. Use: /code [analyze|search|index]"
+                print_result(result)
+                return False
+        else:
+            print("Comando desconhecido. Use /help para ver os comandos disponíveis.")
+    else:
+        print("Por favor, use comandos que começam com /")
+
+    return True
+
+async def cli_interaction(timer: StartupTimer = None):
     """Interactive CLI with modern UI"""
+    timer = timer or StartupTimer()
     print_cli_header()
-    
+    timer.mark("cli header")
+    timer.report()
+
     while True:
+        command_start = None
         try:
             command = input("> ").strip()
+            command_start = time.perf_counter()
+            modules_before = loaded_heavy_modules()
             
             if command.lower() == 'exit':
                 break
-            
-            if command.startswith('/'):
-                parts = command[1:].split()
-                if not parts:
-                    continue
-
-                if parts[0] == 'help':
-                    print_help()
-                    continue
-
-                if parts[0] == 'docs':
-                    if len(parts) < 2:
-                        print("Uso: /docs <consulta>")
-                        continue
-                    query = ' '.join(parts[1:])
-                    result = await search_docs(query)
-                    print_result(result)
-                    continue
-                
-                elif parts[0] == 'git':
-                    if len(parts) < 2:
-                        print("Uso: /git [commits|issues|info|diff]")
-                        continue
-                    if parts[1] == 'commits':
-                        limit = int(parts[2]) if len(parts) > 2 else 5
-                        result = await get_commit_history(limit)
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'issues':
-                        result = await get_issues()
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'info':
-                        result = await get_repo_info()
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'diff':
-                        result = await get_diffs()
-                        print_result(result)
-                        continue
-
-                elif parts[0] == 'memory':
-                    if len(parts) < 2:
-                        print("Uso: /memory [add|get|repo] <conteúdo>")
-                        continue
-                        
-                    if parts[1] == 'repo':
-                        if len(parts) < 3:
-                            print("Uso: /memory repo [add|get] <conteúdo>")
-                            continue
-                            
-                        if parts[2] == 'add':
-                            content = ' '.join(parts[3:])
-                            # Obter contexto do git antes de adicionar memória
-                            git_info = await get_repo_info()
-                            git_context = {}
-                            for line in git_info.split('\n'):
-                                if line.startswith('Branch:'):
-                                    git_context['branch'] = line.split(': ')[1]
-                                elif line.startswith('Last Commit:'):
-                                    git_context['last_commit'] = line.split(': ')[1].split(' ')[0]
-                            result = await add_repo_memory(content, git_context)
-                            print_result(result)
-                            continue
-                        elif parts[2] == 'get':
-                            query = ' '.join(parts[3:])
-                            result = await get_repo_memory(query)
-                            print_result(result)
-                            continue
-                    elif parts[1] == 'add':
-                        content = ' '.join(parts[2:])
-                        result = await add_memory(content)
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'get':
-                        query = ' '.join(parts[2:])
-                        result = await get_memory(query)
-                        print_result(result)
-                        continue
-
-                elif parts[0] == 'github':
-                    if len(parts) < 3:
-                        print("Uso: /github [repo|issues|prs|project|summarize|search] <args>")
-                        continue
-                        
-                    if parts[1] == 'repo':
-                        result = await get_repo_details(parts[2])
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'issues':
-                        state = parts[3] if len(parts) > 3 else 'open'
-                        result = await get_repository_issues(parts[2], state)
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'prs':
-                        state = parts[3] if len(parts) > 3 else 'open'
-                        result = await get_pull_requests(parts[2], state)
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'project':
-                        if len(parts) < 4:
-                            print("Uso: /github project <org> <number>")
-                            continue
-                        result = await get_project_info(parts[2], int(parts[3]))
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'summarize':
-                        if len(parts) < 4:
-                            print("Uso: /github summarize <owner/repo> <issue_number>")
-                            continue
-                        result = await summarize_issue(parts[2], int(parts[3]))
-                        print_result(result)
-                        continue
-                    elif parts[1] == 'search':
-                        query = ' '.join(parts[2:])
-                        language = None
-                        if ' in:' in query:
-                            query, language = query.split(' in:', 1)
-                        result = await search_github_code(query, language)
-                    
-                    # Salvar automaticamente na memória resultados relevantes
-                    if parts[1] in ['summarize', 'project']:
-                        await add_memory(
-                            result,
-                            context_type=f"github_{parts[1]}",
-                            metadata={"command": command, "timestamp": datetime.now().isoformat()}
-                        )
-
-                elif parts[0] == 'code':
-                    if len(parts) < 3:
-                        print("Uso: /code analyze <file> [language]")
-                        continue
-                    
-                    if parts[1] == 'analyze':
-                        file_path = parts[2]
-                        language = parts[3] if len(parts) > 3 else None
-                        
-                        try:
-                            with open(file_path, 'r') as f:
-                                content = f.read()
-                            
-                            # Inferir linguagem do arquivo se não especificada
-                            if not language:
-                                if file_path.endswith('.py'):
-                                    language = 'python'
-                                elif file_path.endswith('.js'):
-                                    language = 'javascript'
-                                elif file_path.endswith('.ts'):
-                                    language = 'typescript'
-                                else:
-                                    language = 'python'  # default
-                            
-                            result = await analyze_file_content(content, language)
-                        except FileNotFoundError:
-                            result = f"Erro: Arquivo '{file_path}' não encontrado"
-                        except Exception as e:
-                            result = f"Erro ao analisar arquivo: {str(e)}"
-                        print_result(result)
-                        continue
-                    else:
-                        result = "Subcomando desconhecido. Use: /code analyze <file> [language]"
-                        print_result(result)
-                        continue
-                else:
-                    print("Comando desconhecido. Use /help para ver os comandos disponíveis.")
-            else:
-                print("Por favor, use comandos que começam com /")
-                
+
+            if not await handle_command(command):
+                continue
+
             # Ask if user wants to continue
             continue_response = input("Continue to iterate? (y/n): ").strip().lower()
             if continue_response != 'y':
@@ -354,15 +650,113 @@ async def cli_interaction():
                 
         except Exception as e:
             print(f"Erro: {str(e)}")
+        finally:
+            if timer.enabled and command_start is not None:
+                elapsed = time.perf_counter() - command_start
+                loaded = loaded_heavy_modules() - modules_before
+                suffix = f" (carregou: {', '.join(sorted(loaded))})" if loaded else ""
+                print(f"⏱  {elapsed * 1000:.1f} ms{suffix}")
+
+def warm_up():
+    """Load heavy dependencies and clients ahead of the first command (daemon mode)"""
+    for loader in (get_repo, get_collection, get_github_client):
+        try:
+            loader()
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Warm-up of {loader.__name__} failed: {e}")
+    for module in ('ollama', 'rich.console', 'rich.panel'):
+        with contextlib.suppress(ImportError):
+            __import__(module)
+    start_code_index()
+
+def start_code_index():
+    """Bring the local code index up to date in the background, if enabled"""
+    if not load_tool_config().get('code_index', {}).get('index_on_start', True):
+        return
+
+    def run():
+        # Criar o cliente do chromadb também fica fora do caminho de inicialização
+        try:
+            index = get_code_index()
+            if index:
+                index.refresh(force=True)
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"Could not start code indexing: {e}")
+    threading.Thread(target=run, name="code-index-start", daemon=True).start()
+
+async def handle_daemon_request(request: dict) -> dict:
+    """Run a daemon request, capturing everything it prints for the client"""
+    from rich.console import Console
+
+    global _console
+    buffer = io.StringIO()
+    previous = _console
+    _console = Console(file=buffer, force_terminal=True, width=request.get('width', 80))
+    ask_continue = False
+    try:
+        with contextlib.redirect_stdout(buffer):
+            try:
+                if request.get('action') == 'header':
+                    print_cli_header()
+                else:
+                    ask_continue = await handle_command(request.get('command', '').strip())
+            except Exception as e:
+                print(f"Erro: {str(e)}")
+    finally:
+        _console = previous
+    return {"output": buffer.getvalue(), "ask_continue": ask_continue}
+
+async def run_daemon():
+    """Serve CLI commands for the current project over a local socket"""
+    import daemon
+
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+    idle_timeout = load_tool_config().get('daemon', {}).get('idle_timeout', daemon.DEFAULT_IDLE_TIMEOUT)
+    await daemon.serve(daemon.socket_path(Path.cwd()), handle_daemon_request, idle_timeout)
 
 if __name__ == "__main__":
-    setup_logging()
     parser = argparse.ArgumentParser(description='MCP Development Agent')
-    parser.add_argument('--mode', choices=['cli', 'server'], default='server',
-                      help='Modo de operação (cli ou server)')
+    parser.add_argument('--mode', choices=['cli', 'server', 'daemon'], default='server',
+                      help='Modo de operação (cli, server ou daemon)')
+    parser.add_argument('--workers', type=int, default=None,
+                      help='Processos que executam as ferramentas no modo server (padrão: server.workers do .agent.json)')
+    parser.add_argument('--timings', action='store_true',
+                      help='Mostrar o tempo gasto em cada fase de inicialização e em cada comando')
+    parser.add_argument('--profile', action='store_true',
+                      help='Gravar perfil e trace de cada comando ou chamada de ferramenta em logs/profiles')
     args = parser.parse_args()
-    
+    if args.profile:
+        profiling.set_enabled(True)
+    timer = StartupTimer(args.timings)
+    timer.mark("imports")
+
+    setup_logging()
+    timer.mark("logging")
+
     if args.mode == 'cli':
-        asyncio.run(cli_interaction())
+        asyncio.run(cli_interaction(timer))
+    elif args.mode == 'daemon':
+        asyncio.run(run_daemon())
     else:
-        mcp.run(transport="sse")  # Server-Sent Events for HTTP transport
\ No newline at end of file
+        server_settings = load_tool_config().get('server', {})
+        workers = args.workers if args.workers is not None else server_settings.get('workers', 1)
+        memory_server = start_shared_memory() if workers > 1 else None
+        worker_pool = create_worker_pool(workers) if workers > 1 else None
+        single_flight = SingleFlight()
+        mcp = create_server(worker_pool, single_flight)
+        start_code_index()
+        timer.mark("server setup")
+        timer.report()
+        try:
+            # Server-Sent Events for HTTP transport, plus /metrics
+            run_sse_server(mcp, worker_pool, server_settings.get('drain_timeout', 30),
+                           server_settings.get('graceful_shutdown_timeout', 5))
+        finally:
+            for name, counts in single_flight.stats().items():
+                logging.getLogger(__name__).info(
+                    f"{name}: {counts['calls']} calls, {counts['executions']} executions, {counts['coalesced']} coalesced")
+            if worker_pool:
+                worker_pool.close()  # No-op se o lifespan já drenou os workers
+            if memory_server:
+                memory_server.terminate()
+                memory_server.wait()
\ No newline at end of file
@@ -1,19 +1,20 @@
 #!/usr/bin/env python3
 import os
 import sys
+import shutil
+import argparse
 from pathlib import Path
 import subprocess
 
+import daemon
+
 def is_git_repo(path):
     """Check if the current directory is a git repository"""
-    try:
-        subprocess.run(['git', 'rev-parse', '--is-inside-work-tree'], 
-                      cwd=path, 
-                      stdout=subprocess.PIPE, 
-                      stderr=subprocess.PIPE)
-        return True
-    except:
-        return False
+    # Procurar por .git nos diretórios pais evita iniciar um processo git
+    for directory in [path, *path.parents]:
+        if (directory / '.git').exists():
+            return True
+    return False
 
 def setup_project_directory(current_dir):
     """Setup required directories in the project"""
@@ -23,7 +24,74 @@ def setup_project_directory(current_dir):
     
     return True
 
+def start_daemon(python_path, main_script, current_dir, env):
+    """Start the agent daemon for current_dir in the background"""
+    log_file = open(current_dir / 'logs' / 'daemon.log', 'a')
+    subprocess.Popen([str(python_path), str(main_script), "--mode", "daemon"],
+                     cwd=current_dir,
+                     env=env,
+                     stdin=subprocess.DEVNULL,
+                     stdout=log_file,
+                     stderr=subprocess.STDOUT,
+                     start_new_session=True)
+    log_file.close()
+
+def run_with_daemon(python_path, main_script, current_dir, env):
+    """Run the interactive CLI against a warm daemon, starting it if needed.
+
+    Returns False if the daemon could not be reached.
+    """
+    path = daemon.socket_path(current_dir)
+    client = daemon.connect(path)
+    if client is None:
+        start_daemon(python_path, main_script, current_dir, env)
+        client = daemon.connect(path, timeout=daemon.STARTUP_TIMEOUT)
+        if client is None:
+            return False
+
+    try:
+        width = shutil.get_terminal_size().columns
+        print(client.request("header", width=width)["output"], end="")
+        while True:
+            try:
+                command = input("> ").strip()
+                if command.lower() == 'exit':
+                    break
+
+                response = client.request("command", command, width=width)
+                print(response["output"], end="")
+                if not response["ask_continue"]:
+                    continue
+
+                # Ask if user wants to continue
+                continue_response = input("Continue to iterate? (y/n): ").strip().lower()
+                if continue_response != 'y':
+                    break
+            except (EOFError, KeyboardInterrupt):
+                print()
+                break
+    finally:
+        client.close()
+    return True
+
+def stop_daemon(current_dir):
+    """Ask the daemon serving current_dir to shut down"""
+    client = daemon.connect(daemon.socket_path(current_dir))
+    if client is None:
+        print("Nenhum daemon em execução para este diretório.")
+        return
+    client.request("shutdown")
+    client.close()
+    print("Daemon encerrado.")
+
 def main():
+    parser = argparse.ArgumentParser(description='MCP Dev Agent CLI')
+    parser.add_argument('--no-daemon', action='store_true',
+                        help='Executar o agente em um novo processo, sem reutilizar o daemon')
+    parser.add_argument('--stop-daemon', action='store_true',
+                        help='Encerrar o daemon do diretório atual')
+    args = parser.parse_args()
+
     # Get the installation directory (where mcp-dev-agent is installed)
     install_dir = Path(os.path.dirname(os.path.realpath(__file__)))
     
@@ -33,6 +101,10 @@ def main():
     if not is_git_repo(current_dir):
         print("❌ Error: O MCP Dev Agent CLI deve ser executado dentro de um repositório Git.")
         sys.exit(1)
+
+    if args.stop_daemon:
+        stop_daemon(current_dir)
+        sys.exit(0)
     
     # Setup project directory structure
     setup_project_directory(current_dir)
@@ -52,8 +124,14 @@ def main():
     # Set up environment
     env = os.environ.copy()
     env["PYTHONPATH"] = str(install_dir)
-    
+
+    use_daemon = daemon.is_supported() and not args.no_daemon and not os.getenv('MCP_DEV_AGENT_NO_DAEMON')
     try:
+        if use_daemon and run_with_daemon(python_path, main_script, current_dir, env):
+            sys.exit(0)
+        if use_daemon:
+            print("⚠️  Não foi possível iniciar o daemon, executando o CLI diretamente...")
+
         # Execute o CLI no diretório atual
         process = subprocess.run([str(python_path), str(main_script), "--mode", "cli"],
                                cwd=current_dir,
@@ -67,4 +145,4 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,131 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from .config import load_agent_config
+from .metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
+# Fora de qualquer working tree: arquivos de cache não aparecem como untracked no projeto inspecionado
+CACHE_DIR_NAME = "mcp-dev-agent"
+DEFAULT_MAX_AGE = 86400
+
+def cache_directory() -> Path:
+    """Configured `cache.directory`, or the per-user cache directory"""
+    directory = load_agent_config().get('cache', {}).get('directory')
+    if directory:
+        return Path(directory).expanduser()
+    if os.name == 'nt':
+        base = os.getenv('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    else:
+        base = os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / CACHE_DIR_NAME
+
+def content_hash(*parts: str) -> str:
+    """Build a stable SHA-256 key from one or more text parts"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8', errors='replace'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def _try_lock(f) -> bool:
+    """Non-blocking exclusive lock on an open file (flock on Unix, msvcrt on Windows)"""
+    try:
+        import fcntl
+    except ImportError:
+        fcntl = None
+    try:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+    except ImportError:
+        return True  # Sem suporte a locks: seguir sem exclusão entre processos
+    except OSError:
+        return False
+    return True
+
+def _unlock(f) -> None:
+    try:
+        import fcntl
+        fcntl.flock(f, fcntl.LOCK_UN)
+    except ImportError:
+        try:
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        except (ImportError, OSError):
+            pass
+
+@contextmanager
+def file_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Exclusive lock shared between processes, held while the block runs.
+
+    With blocking=False yields False right away if another process holds it.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a+') as f:
+        acquired = _try_lock(f)
+        while not acquired and blocking:
+            time.sleep(0.05)
+            acquired = _try_lock(f)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                _unlock(f)
+
+class DiskCache:
+    """Small JSON cache on disk, configured by the `cache` section of .agent.json"""
+
+    def __init__(self, namespace: str):
+        self.namespace = namespace
+        settings = load_agent_config().get('cache', {})
+        self.enabled = settings.get('enabled', True)
+        self.max_age = settings.get('max_age', DEFAULT_MAX_AGE)
+        self.directory = cache_directory() / namespace
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            if self.max_age and time.time() - path.stat().st_mtime > self.max_age:
+                record_cache(self.namespace, False)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            record_cache(self.namespace, True)
+            return value
+        except (OSError, ValueError):
+            record_cache(self.namespace, False)
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value under key"""
+        if not self.enabled:
+            return
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Escrita atômica para não deixar arquivos parciais no cache
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
@@ -0,0 +1,304 @@
+import ast
+import re
+from typing import Dict, List, Optional, Tuple
+
+# Aproximação simples: ~4 caracteres por token para código
+CHARS_PER_TOKEN = 4
+
+_BLOCK_STARTS = {
+    'python': re.compile(r'^(?:async\s+def|def|class)\s+(\w+)'),
+    'javascript': re.compile(
+        r'^(?:export\s+)?(?:default\s+)?(?:async\s+)?'
+        r'(?:function\*?\s+(\w+)|class\s+(\w+)|(?:const|let|var)\s+(\w+)\s*=)'
+    ),
+}
+_BLOCK_STARTS['typescript'] = re.compile(
+    r'^(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?'
+    r'(?:function\*?\s+(\w+)|class\s+(\w+)|interface\s+(\w+)|type\s+(\w+)|enum\s+(\w+)|(?:const|let|var)\s+(\w+)\s*[:=])'
+)
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of model tokens in a piece of text"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+# Definições aninhadas em JavaScript/TypeScript: funções, classes, métodos e arrow functions
+_NESTED_START = re.compile(
+    r'^(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function\*?\s+(\w+)|(?:abstract\s+)?class\s+(\w+)|'
+    r'(?:const|let|var)\s+(\w+)\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|\w+\s*=>))'
+)
+_METHOD_START = re.compile(
+    r'^(?:(?:public|private|protected|static|async|readonly|override|abstract|get|set)\s+)*\*?\s*(\w+)\s*(?:<[^>]*>)?\('
+)
+_NOT_METHODS = {'if', 'for', 'while', 'switch', 'catch', 'return', 'function', 'new', 'await', 'typeof'}
+
+def _block_name(match: re.Match) -> str:
+    return next((group for group in match.groups() if group), '')
+
+def _python_definitions(lines: List[str]) -> Optional[List[Dict]]:
+    """Functions and classes at any depth, located with the ast module (None on syntax errors)"""
+    try:
+        tree = ast.parse('\n'.join(lines))
+    except (SyntaxError, ValueError):
+        return None
+
+    definitions = []
+
+    def visit(node: ast.AST, prefix: str, depth: int) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([child.lineno] + [decorator.lineno for decorator in child.decorator_list])
+                definitions.append({"start_line": start, "end_line": child.end_lineno,
+                                    "name": prefix + child.name, "depth": depth})
+                visit(child, f"{prefix}{child.name}.", depth + 1)
+            else:
+                visit(child, prefix, depth)
+
+    visit(tree, "", 0)
+    return sorted(definitions, key=lambda definition: definition["start_line"])
+
+def _scan_braces(lines: List[str]) -> Tuple[List[int], List[int], List[str]]:
+    """Brace depth at the start of each line and the highest depth reached in it.
+
+    Strings, template literals and comments are skipped. Also returns each
+    line with strings and comments blanked out, for statement-end checks.
+    """
+    depth_at_start, max_depth, code_lines = [], [], []
+    depth = 0
+    # Pilha de contextos: None = código, '`' = template literal; profundidade em que cada ${ abriu
+    templates: List[int] = []
+    in_template = False
+    in_comment = False
+    for line in lines:
+        depth_at_start.append(depth)
+        highest = depth
+        code = []
+        index = 0
+        while index < len(line):
+            char = line[index]
+            if in_comment:
+                if line.startswith('*/', index):
+                    in_comment = False
+                    index += 1
+            elif in_template:
+                if char == '\\':
+                    index += 1
+                elif char == '`':
+                    in_template = False
+                elif line.startswith('${', index):
+                    templates.append(depth)
+                    in_template = False
+                    depth += 1
+                    index += 1
+            elif line.startswith('//', index):
+                break
+            elif line.startswith('/*', index):
+                in_comment = True
+                index += 1
+            elif char in ('"', "'"):
+                closing = index + 1
+                while closing < len(line) and line[closing] != char:
+                    closing += 2 if line[closing] == '\\' else 1
+                index = closing
+            elif char == '`':
+                in_template = True
+            elif char == '{':
+                depth += 1
+                highest = max(highest, depth)
+                code.append(char)
+            elif char == '}':
+                depth -= 1
+                code.append(char)
+                if templates and depth == templates[-1]:
+                    templates.pop()
+                    in_template = True
+            else:
+                code.append(char)
+            index += 1
+        max_depth.append(highest)
+        code_lines.append(''.join(code).rstrip())
+    return depth_at_start, max_depth, code_lines
+
+def _script_definitions(lines: List[str], language: str) -> List[Dict]:
+    """Functions, classes and methods of JavaScript/TypeScript, ended by brace matching"""
+    top_level = _BLOCK_STARTS[language]
+    depth_at_start, max_depth, code_lines = _scan_braces(lines)
+    depth_after = depth_at_start[1:] + [0]
+
+    def block_end(index: int, limit: int) -> int:
+        depth = depth_at_start[index]
+        opened = False
+        for number in range(index, limit):
+            opened = opened or max_depth[number] > depth
+            if opened and depth_after[number] <= depth:
+                return number + 1
+            if not opened and code_lines[number].endswith(';') and depth_after[number] == depth:
+                return number + 1
+        return limit
+
+    definitions: List[Dict] = []
+    # Definições abertas: (dict, profundidade do corpo, é classe)
+    stack: List[Tuple[Dict, int, bool]] = []
+    for index, line in enumerate(lines):
+        stripped = line.strip()
+        while stack and stack[-1][0]["end_line"] <= index:
+            stack.pop()
+        if not stripped or stripped.startswith(('//', '/*', '*', '@')):
+            continue
+        depth = depth_at_start[index]
+        name = None
+        is_class = False
+        if depth == 0 and not line[0].isspace():
+            match = top_level.match(line)
+            if match:
+                name = _block_name(match)
+                is_class = re.search(r'\bclass\s', line[:match.end()]) is not None
+        elif stack:
+            match = _NESTED_START.match(stripped)
+            if match:
+                name = _block_name(match)
+                is_class = match.group(2) is not None
+            elif stack[-1][2] and depth == stack[-1][1]:
+                method = _METHOD_START.match(stripped)
+                if method and method.group(1) not in _NOT_METHODS:
+                    name = method.group(1)
+        if not name:
+            continue
+
+        start = index
+        while start > 0 and lines[start - 1].strip().startswith('@'):
+            start -= 1  # Decoradores do TypeScript
+        limit = stack[-1][0]["end_line"] if stack else len(lines)
+        if depth == 0:
+            # Definições de topo nunca passam da próxima definição de topo
+            limit = next((number for number in range(index + 1, len(lines))
+                          if depth_at_start[number] == 0 and lines[number][:1].strip()
+                          and top_level.match(lines[number])), limit)
+        prefix = stack[-1][0]["name"] + "." if stack else ""
+        definition = {"start_line": start + 1, "end_line": block_end(index, limit),
+                      "name": prefix + name, "depth": len(stack)}
+        definitions.append(definition)
+        stack.append((definition, depth + 1, is_class))
+    return definitions
+
+def _indented_definitions(lines: List[str], pattern: re.Pattern) -> List[Dict]:
+    """Top-level definitions ended at the next top-level line (for files ast cannot parse)"""
+    definitions = []
+    pending_decorator = None
+    for index, line in enumerate(lines):
+        if not line or line[0].isspace():
+            continue
+        if line.startswith('@'):
+            if pending_decorator is None:
+                pending_decorator = index
+            continue
+        match = pattern.match(line)
+        if match:
+            end = next((number for number in range(index + 1, len(lines))
+                        if lines[number][:1].strip() and lines[number][0] not in ')]}'), len(lines))
+            start = pending_decorator if pending_decorator is not None else index
+            definitions.append({"start_line": start + 1, "end_line": end, "name": _block_name(match), "depth": 0})
+        pending_decorator = None
+    return definitions
+
+def find_definitions(lines: List[str], language: Optional[str]) -> List[Dict]:
+    """Functions, classes and methods at any depth, ordered by start line.
+
+    Each dict has 1-based inclusive `start_line`/`end_line`, the qualified
+    `name` (`Class.method`) and the nesting `depth` (0 for top level).
+    Python is parsed with `ast`; JavaScript/TypeScript blocks end at their
+    matching brace, ignoring braces inside strings and comments.
+    """
+    if language == 'python':
+        definitions = _python_definitions(lines)
+        return definitions if definitions is not None else _indented_definitions(lines, _BLOCK_STARTS['python'])
+    if language in _BLOCK_STARTS:
+        return _script_definitions(lines, language)
+    return []
+
+def find_blocks(lines: List[str], language: str) -> List[Dict]:
+    """Split lines into top-level structural blocks (functions, classes and module code).
+
+    Each block is a dict with 1-based inclusive `start_line`/`end_line` and the
+    `name` of the function or class it defines (None for module-level code).
+    Module code between or after definitions becomes a block of its own.
+    """
+    if language not in _BLOCK_STARTS:
+        # Linguagem desconhecida: usar parágrafos separados por linhas em branco
+        starts = [index for index, line in enumerate(lines)
+                  if index == 0 or (line[:1].strip() and not lines[index - 1].strip())]
+        ends = starts[1:] + [len(lines)]
+        return [{"start_line": start + 1, "end_line": end, "name": None} for start, end in zip(starts, ends)]
+
+    blocks = []
+    cursor = 0
+    for definition in find_definitions(lines, language):
+        if definition["depth"] or definition["start_line"] <= cursor:
+            continue
+        start, end = definition["start_line"] - 1, definition["end_line"]
+        if start > cursor:
+            blocks.append({"start_line": cursor + 1, "end_line": start, "name": None})
+        # Linhas em branco depois do corpo ficam com o bloco
+        while end < len(lines) and not lines[end].strip():
+            end += 1
+        blocks.append({"start_line": start + 1, "end_line": end, "name": definition["name"]})
+        cursor = end
+    if cursor < len(lines):
+        blocks.append({"start_line": cursor + 1, "end_line": len(lines), "name": None})
+    return blocks
+
+def _split_oversized(lines: List[str], block: Dict, max_tokens: int) -> List[Dict]:
+    """Split a block that does not fit the budget, preferring blank-line boundaries"""
+    pieces = []
+    start = block["start_line"]
+    size = 0
+    last_blank = None
+    for number in range(block["start_line"], block["end_line"] + 1):
+        line_tokens = estimate_tokens(lines[number - 1] + '\n')
+        if size + line_tokens > max_tokens and number > start:
+            cut = last_blank if last_blank and last_blank > start else number - 1
+            pieces.append({"start_line": start, "end_line": cut, "name": block["name"]})
+            start = cut + 1
+            size = sum(estimate_tokens(lines[n - 1] + '\n') for n in range(start, number))
+            last_blank = None
+        size += line_tokens
+        if not lines[number - 1].strip():
+            last_blank = number
+    pieces.append({"start_line": start, "end_line": block["end_line"], "name": block["name"]})
+    return pieces
+
+def split_into_chunks(content: str, language: str, max_tokens: int) -> List[Dict]:
+    """Pack structural blocks of a file into chunks of at most max_tokens.
+
+    Returns dicts with `start_line`, `end_line`, `names` (functions/classes
+    in the chunk) and `content`. Blocks are only split when a single block
+    is larger than the budget on its own.
+    """
+    lines = content.split('\n')
+    max_tokens = max(max_tokens, 1)
+
+    blocks = []
+    for block in find_blocks(lines, language):
+        text = '\n'.join(lines[block["start_line"] - 1:block["end_line"]])
+        if estimate_tokens(text) > max_tokens:
+            blocks.extend(_split_oversized(lines, block, max_tokens))
+        else:
+            blocks.append(block)
+
+    chunks = []
+    current = None
+    for block in blocks:
+        text = '\n'.join(lines[block["start_line"] - 1:block["end_line"]])
+        tokens = estimate_tokens(text)
+        if current and current["tokens"] + tokens <= max_tokens:
+            current["end_line"] = block["end_line"]
+            current["tokens"] += tokens
+        else:
+            current = {"start_line": block["start_line"], "end_line": block["end_line"],
+                       "names": [], "tokens": tokens}
+            chunks.append(current)
+        if block["name"] and block["name"] not in current["names"]:
+            current["names"].append(block["name"])
+
+    for chunk in chunks:
+        chunk["content"] = '\n'.join(lines[chunk["start_line"] - 1:chunk["end_line"]])
+    return chunks
@@ -0,0 +1,322 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from .cache import DiskCache, content_hash, file_lock
+from .code_chunker import split_into_chunks
+from .config import load_agent_config
+from .git_tool import get_repo
+from .metrics import external_call
+
+if TYPE_CHECKING:
+    from git import Repo
+
+logger = logging.getLogger(__name__)
+
+# Linguagens com divisão estrutural; as demais extensões são divididas por parágrafos
+LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript',
+    '.ts': 'typescript', '.tsx': 'typescript',
+}
+TEXT_EXTENSIONS = {'.go', '.rs', '.java', '.kt', '.rb', '.php', '.c', '.h', '.cpp', '.hpp', '.cs',
+                   '.swift', '.scala', '.sh', '.sql', '.md'}
+# O modelo de embeddings padrão do chromadb trunca textos longos; trechos menores recuperam melhor
+DEFAULT_CHUNK_TOKENS = 400
+DEFAULT_MAX_FILE_BYTES = 256 * 1024
+# Intervalo mínimo entre verificações de arquivos alterados disparadas por buscas
+REFRESH_INTERVAL = 30
+# Trechos enviados ao chromadb por chamada
+EMBED_BATCH_SIZE = 64
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_index_client():
+    """chromadb client of the code index, persisted under `cache.directory`.
+
+    Kept apart from the memory store so the index survives restarts and is
+    shared by the daemon and server workers whatever the `memory` settings.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            import chromadb
+
+            cache = DiskCache("code_index")
+            if cache.enabled:
+                _client = chromadb.PersistentClient(path=str(cache.directory / "chroma"))
+            else:
+                _client = chromadb.Client()
+    return _client
+
+def _blob_sha(data: bytes) -> str:
+    """Same SHA git computes for a blob, for files not yet staged"""
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+def _language(path: str) -> Optional[str]:
+    extension = os.path.splitext(path)[1].lower()
+    if extension in LANGUAGES:
+        return LANGUAGES[extension]
+    return 'text' if extension in TEXT_EXTENSIONS else None
+
+class CodeIndex:
+    """Semantic index of the repository source in a dedicated chromadb collection.
+
+    Files are split into structural chunks and re-embedded only when their
+    git blob SHA changes. Updates run in a background thread; searches use
+    whatever is already indexed. A server with workers keeps the index in
+    its main process, so a single process writes to the store.
+    """
+
+    def __init__(self, repo: "Repo"):
+        self.repo = repo
+        self.root = repo.working_tree_dir
+        settings = load_agent_config().get('code_index', {})
+        self.chunk_tokens = settings.get('chunk_tokens', DEFAULT_CHUNK_TOKENS)
+        self.max_file_bytes = settings.get('max_file_bytes', DEFAULT_MAX_FILE_BYTES)
+        key = content_hash(os.path.abspath(self.root))[:12]
+        with external_call("chromadb", "get_collection"):
+            self.collection = get_index_client().get_or_create_collection(f"code-{key}")
+        cache = DiskCache("code_index")
+        self.manifest_path = cache.directory / f"{key}-manifest.json" if cache.enabled else None
+        self.lock_path = cache.directory / f"{key}.lock"
+        self.manifest = self._load_manifest()
+        self.progress = {"running": False, "done": 0, "total": 0, "last_update": None, "error": None}
+        self._lock = threading.Lock()
+        # Atualizações em segundo plano e via /code index nunca rodam ao mesmo tempo
+        self._updating = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._last_refresh = 0.0
+
+    def current_files(self) -> Dict[str, str]:
+        """Indexable files of the working tree mapped to their blob SHA"""
+        files = {}
+        output = self.repo.git.ls_files('-s', '-z')
+        for entry in filter(None, output.split('\0')):
+            meta, path = entry.split('\t', 1)
+            mode, sha = meta.split()[:2]
+            if mode.startswith('100') and _language(path):
+                files[path] = sha
+        # Arquivos alterados ou novos: o SHA do índice do git não reflete o working tree
+        output = self.repo.git.ls_files('-m', '-o', '--exclude-standard', '-z')
+        for path in filter(None, output.split('\0')):
+            if not _language(path):
+                continue
+            try:
+                with open(os.path.join(self.root, path), 'rb') as f:
+                    files[path] = _blob_sha(f.read())
+            except OSError:
+                files.pop(path, None)  # Removido do working tree
+        return files
+
+    def _load_manifest(self) -> Dict[str, str]:
+        if self.manifest_path is None:
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Coleção apagada ou recriada: o manifesto não descreve mais o que está indexado
+        if manifest and not self.collection.count():
+            return {}
+        return manifest
+
+    def _save_manifest(self) -> None:
+        if self.manifest_path is None:
+            return
+        try:
+            self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.manifest_path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.manifest, f)
+            os.replace(tmp_path, self.manifest_path)
+        except OSError as e:
+            logger.warning(f"Could not write code index manifest: {e}")
+
+    def indexed_files(self) -> Dict[str, str]:
+        """Files already in the collection mapped to the blob SHA they were embedded from"""
+        return dict(self.manifest)
+
+    def _chunks(self, path: str, sha: str) -> List[Dict]:
+        full_path = os.path.join(self.root, path)
+        if os.path.getsize(full_path) > self.max_file_bytes:
+            return []
+        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        if '\0' in content:
+            return []  # Binário com extensão de código
+        language = _language(path)
+        return [{
+            "id": f"{path}:{index}:{sha[:12]}",
+            "document": f"{path}\n{chunk['content']}",
+            "metadata": {
+                "path": path,
+                "blob_sha": sha,
+                "language": language,
+                "start_line": chunk["start_line"],
+                "end_line": chunk["end_line"],
+                "names": ", ".join(chunk["names"]),
+            }
+        } for index, chunk in enumerate(split_into_chunks(content, language, self.chunk_tokens))
+            if chunk["content"].strip()]
+
+    def _embed(self, chunks: List[Dict]) -> None:
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = chunks[start:start + EMBED_BATCH_SIZE]
+            with external_call("chromadb", "upsert"):
+                self.collection.upsert(
+                    ids=[chunk["id"] for chunk in batch],
+                    documents=[chunk["document"] for chunk in batch],
+                    metadatas=[chunk["metadata"] for chunk in batch]
+                )
+
+    def update(self) -> Dict:
+        """Re-embed changed files and drop deleted ones; returns counts of the work done.
+
+        Only one process updates a given index at a time: if another one (the
+        daemon, a CLI or a server) holds the lock, returns with `busy` set.
+        """
+        with self._updating:
+            if self.manifest_path is None:
+                return self._update()
+            with file_lock(self.lock_path, blocking=False) as acquired:
+                if not acquired:
+                    logger.info("Code index is being updated by another process")
+                    return {"embedded": 0, "removed": 0, "files": len(self.manifest), "busy": True}
+                # Outro processo pode ter atualizado o índice desde a última leitura
+                self.manifest = self._load_manifest()
+                return self._update()
+
+    def _update(self) -> Dict:
+        with self._lock:
+            self.progress.update(running=True, done=0, total=0, error=None)
+        stale: List[str] = []
+        changed: List[str] = []
+        try:
+            with external_call("git", "ls_files"):
+                current = self.current_files()
+            indexed = self.indexed_files()
+            stale = [path for path, sha in indexed.items() if current.get(path) != sha]
+            changed = [path for path, sha in current.items() if indexed.get(path) != sha]
+            self.progress["total"] = len(changed)
+
+            for path in stale:
+                with external_call("chromadb", "delete"):
+                    self.collection.delete(where={"path": path})
+                self.manifest.pop(path, None)
+            pending: List[Dict] = []
+            # Arquivos cujos trechos já foram todos enviados ao chromadb entram no manifesto
+            processed: List[str] = []
+            for path in changed:
+                try:
+                    pending.extend(self._chunks(path, current[path]))
+                except OSError as e:
+                    logger.warning(f"Could not index {path}: {e}")
+                processed.append(path)
+                if len(pending) >= EMBED_BATCH_SIZE:
+                    self._embed(pending)
+                    pending = []
+                    self.manifest.update((done, current[done]) for done in processed)
+                    processed = []
+                self.progress["done"] += 1
+            self._embed(pending)
+            self.manifest.update((done, current[done]) for done in processed)
+
+            self.progress["last_update"] = time.time()
+            if changed or stale:
+                logger.info(f"Code index updated: {len(changed)} files embedded, {len(stale)} removed")
+            return {"embedded": len(changed), "removed": len(set(stale) - set(changed)), "files": len(current)}
+        except Exception as e:
+            self.progress["error"] = str(e)
+            raise
+        finally:
+            if stale or changed:
+                self._save_manifest()
+            self.progress["running"] = False
+
+    def _update_in_background(self) -> None:
+        try:
+            self.update()
+        except Exception as e:
+            logger.error(f"Error updating code index: {e}")
+
+    def refresh(self, force: bool = False) -> None:
+        """Start a background update unless one is running or the last one is recent"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            if not force and time.monotonic() - self._last_refresh < REFRESH_INTERVAL:
+                return
+            self._last_refresh = time.monotonic()
+            self._thread = threading.Thread(target=self._update_in_background, name="code-index", daemon=True)
+            self._thread.start()
+
+    def search(self, query: str, n_results: int = 5, language: Optional[str] = None) -> List[Dict]:
+        """Chunks most similar to query, best first"""
+        if not self.collection.count():
+            return []
+        with external_call("chromadb", "query"):
+            results = self.collection.query(
+                query_texts=[query],
+                n_results=n_results,
+                where={"language": language} if language else None
+            )
+        return [dict(metadata, content=document.split('\n', 1)[-1], distance=distance)
+                for document, metadata, distance in zip(results['documents'][0], results['metadatas'][0],
+                                                        results['distances'][0])]
+
+_indexes: Dict[str, CodeIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_code_index(path: Optional[str] = None) -> Optional[CodeIndex]:
+    """Shared CodeIndex for the repository at path (defaults to the current directory)"""
+    repo = get_repo(path)
+    if repo is None or repo.working_tree_dir is None:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(repo.working_tree_dir)
+        if index is None:
+            index = CodeIndex(repo)
+            _indexes[repo.working_tree_dir] = index
+    return index
+
+def format_progress(index: CodeIndex) -> str:
+    progress = index.progress
+    if progress["running"]:
+        return f"⏳ Indexação em andamento: {progress['done']}/{progress['total']} arquivos"
+    if progress["error"]:
+        return f"⚠️ Última indexação falhou: {progress['error']}"
+    return ""
+
+async def search_code_local(query: str, n_results: int = 5, language: Optional[str] = None) -> str:
+    """Semantic search over the code of the local repository (offline, no GitHub round trip)"""
+    try:
+        index = get_code_index()
+        if index is None:
+            return "Nenhum repositório git encontrado"
+        index.refresh()
+        results = await asyncio.to_thread(index.search, query, n_results, language)
+        status = format_progress(index)
+        if not results:
+            if index.progress["running"] or not index.progress["last_update"]:
+                return "O índice do código está sendo construído em segundo plano; tente novamente em instantes."
+            return "Nenhum trecho de código encontrado" + (f"\n{status}" if status else "")
+
+        found = []
+        for result in results:
+            names = f" ({result['names']})" if result['names'] else ""
+            lines = result['content'].split('\n')
+            snippet = '\n'.join(lines[:20]) + ("\n..." if len(lines) > 20 else "")
+            found.append(f"📄 {result['path']}:{result['start_line']}-{result['end_line']}{names}\n{snippet}")
+        return "\n---\n".join(found) + (f"\n\n{status}" if status else "")
+    except Exception as e:
+        logger.error(f"Error searching local code: {e}")
+        return f"Erro ao buscar no código local: {str(e)}"
@@ -0,0 +1,24 @@
+import json
+from pathlib import Path
+from typing import Dict
+
+DEFAULT_MODEL = "codellama"
+DEFAULT_CONTEXT_WINDOW = 4096
+
+def load_agent_config() -> Dict:
+    """Load agent configuration from .agent.json"""
+    config_path = Path('.agent.json')
+    if not config_path.exists():
+        return {}
+
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+def get_model_parameters(model: str = DEFAULT_MODEL) -> Dict:
+    """Get the parameters configured for a model in .agent.json"""
+    models = load_agent_config().get('models', {})
+    return models.get(model, {}).get('parameters', {})
+
+def get_context_window(model: str = DEFAULT_MODEL) -> int:
+    """Get the context window (in tokens) configured for a model"""
+    return int(get_model_parameters(model).get('context_window', DEFAULT_CONTEXT_WINDOW))
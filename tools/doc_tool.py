@@ -2,8 +2,8 @@ import os
 import json
 from pathlib import Path
 from typing import Dict
-import ollama
 import logging
+from .metrics import external_call, record_llm_usage
 
 logger = logging.getLogger(__name__)
 
@@ -34,14 +34,18 @@ Focus on best practices and practical usage examples.
 
 Query: {query}"""
 
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }],
-                stream=False
-            )
+            import ollama
+
+            with external_call("ollama", "chat"):
+                response = ollama.chat(
+                    model=self.model,
+                    messages=[{
+                        'role': 'user',
+                        'content': prompt
+                    }],
+                    stream=False
+                )
+            record_llm_usage(self.model, response)
             
             print("✅ Pesquisa concluída!")
             return response['message']['content'].strip()
@@ -0,0 +1,396 @@
+import heapq
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+from .cache import DiskCache, content_hash, file_lock
+from .metrics import external_call
+
+if TYPE_CHECKING:
+    from git import Repo
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 2
+# Número máximo de pontas (HEADs já indexados) usadas para excluir commits conhecidos
+MAX_TIPS = 50
+# Quantidade de ordenações de histórico mantidas em memória (uma por HEAD)
+MAX_ORDERINGS = 4
+
+_RECORD_SEP = '\x1e'
+_FIELD_SEP = '\x1f'
+_LOG_FORMAT = _FIELD_SEP.join(['%x1e%H', '%P', '%an', '%ae', '%at', '%ct', '%B']) + '%x1f'
+_BLAME_HEADER = re.compile(r'^([0-9a-f]{40}) \d+ (\d+)(?: \d+)?$')
+
+def _parse_date(value: Optional[str]) -> Optional[int]:
+    """Convert an ISO date (YYYY-MM-DD or full timestamp) to a unix timestamp"""
+    if not value:
+        return None
+    return int(datetime.fromisoformat(value).timestamp())
+
+def _parse_record(raw: str) -> Optional[Dict]:
+    fields = raw.split(_FIELD_SEP)
+    if len(fields) < 8:
+        return None
+    sha, parents, author, email, authored, committed, message, files = fields[:8]
+    return {
+        "sha": sha,
+        "parents": parents.split(),
+        "author": author,
+        "email": email,
+        "date": int(authored),
+        "committed": int(committed),
+        "message": message.strip(),
+        "files": [line for line in files.split('\n') if line.strip()]
+    }
+
+class CommitGraph:
+    """Persistent commit metadata cache for one repository.
+
+    Commits are appended to a JSON lines file as they are discovered; new
+    commits are found with `git log HEAD --not <known tips>`, so already
+    indexed history is never walked again. The path -> commits index is
+    kept next to it and extended with each new batch of commits.
+    """
+
+    def __init__(self, repo: "Repo"):
+        self.repo = repo
+        cache = DiskCache("git")
+        self.persist = cache.enabled
+        key = content_hash(os.path.abspath(repo.git_dir))[:16]
+        self.commits_path = cache.directory / f"{key}-commits.jsonl"
+        self.meta_path = cache.directory / f"{key}-meta.json"
+        self.paths_path = cache.directory / f"{key}-paths.jsonl"
+        self.lock_path = cache.directory / f"{key}.lock"
+        self.commits: Dict[str, Dict] = {}
+        self.tips: List[str] = []
+        self._orderings: Dict[str, List[str]] = {}
+        self._positions: Dict[str, Dict[str, int]] = {}
+        self._paths: Dict[str, List[str]] = {}
+        self._lock = threading.RLock()
+        self._load()
+        self._load_paths()
+
+    def _load(self) -> None:
+        if not self.persist:
+            return
+        try:
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                return
+            with open(self.commits_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.commits[record["sha"]] = record
+            # Só confiar nas pontas cujo histórico foi totalmente gravado
+            self.tips = [tip for tip in meta.get("tips", []) if tip in self.commits]
+        except (OSError, ValueError) as e:
+            if self.commits_path.exists():
+                logger.warning(f"Commit cache unreadable, rebuilding: {e}")
+            self.commits, self.tips = {}, []
+
+    def _load_paths(self) -> None:
+        """Read the persisted path index, indexing any cached commit it does not cover"""
+        covered = set()
+        if self.persist and self.commits:
+            try:
+                with open(self.paths_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        batch = json.loads(line)
+                        # Lotes repetidos por processos concorrentes não duplicam entradas
+                        fresh = set(batch["commits"]) - covered
+                        covered |= fresh
+                        for path, shas in batch["paths"].items():
+                            shas = [sha for sha in shas if sha in fresh]
+                            if shas:
+                                self._paths.setdefault(path, []).extend(shas)
+            except (OSError, ValueError, KeyError) as e:
+                if self.paths_path.exists():
+                    logger.warning(f"Path index unreadable, rebuilding: {e}")
+                self._paths, covered = {}, set()
+        for sha, record in self.commits.items():
+            if sha not in covered:
+                self._index_paths(record)
+
+    def _write_meta(self, tips: List[str]) -> None:
+        # Nome temporário único por processo; os.replace torna a troca atômica
+        fd, tmp_path = tempfile.mkstemp(dir=self.meta_path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": INDEX_VERSION, "tips": tips}, f)
+            os.replace(tmp_path, self.meta_path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _path_batch(records: List[Dict]) -> str:
+        paths: Dict[str, List[str]] = {}
+        for record in records:
+            for path in record["files"]:
+                paths.setdefault(path, []).append(record["sha"])
+        batch = {"commits": [record["sha"] for record in records], "paths": paths}
+        return json.dumps(batch, ensure_ascii=False) + '\n'
+
+    def _save(self, new_records: List[Dict]) -> None:
+        if not self.persist:
+            return
+        try:
+            self.commits_path.parent.mkdir(parents=True, exist_ok=True)
+            # Servidor, daemon e workers podem gravar o mesmo cache ao mesmo tempo
+            with file_lock(self.lock_path):
+                tips = self.tips
+                try:
+                    with open(self.meta_path, 'r', encoding='utf-8') as f:
+                        meta = json.load(f)
+                except (OSError, ValueError):
+                    meta = {}
+                # Cache de outra versão ou incompleto: regravar tudo em vez de anexar
+                if meta.get("version") == INDEX_VERSION and self.commits_path.exists():
+                    mode = 'a'
+                    # Manter as pontas gravadas por outros processos
+                    tips = (tips + [tip for tip in meta.get("tips", []) if tip not in tips])[:MAX_TIPS]
+                else:
+                    mode = 'w'
+                    new_records = list(self.commits.values())
+                with open(self.commits_path, mode, encoding='utf-8') as f:
+                    f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in new_records))
+                if new_records or mode == 'w':
+                    with open(self.paths_path, mode, encoding='utf-8') as f:
+                        f.write(self._path_batch(new_records))
+                self._write_meta(tips)
+        except OSError as e:
+            logger.warning(f"Could not persist commit cache: {e}")
+
+    def _valid_tips(self) -> List[str]:
+        """Drop tips whose objects no longer exist (e.g. after a force-push and gc)"""
+        valid = []
+        for tip in self.tips:
+            try:
+                self.repo.git.cat_file('-e', f"{tip}^{{commit}}")
+                valid.append(tip)
+            except Exception:
+                pass
+        return valid
+
+    def _walk(self, head: str, exclude: List[str]) -> Iterator[Dict]:
+        """Stream commit records reachable from head but not from exclude"""
+        # Merges listam os arquivos alterados em relação ao primeiro pai
+        args = ['git', '-c', 'core.quotePath=false', 'log', f'--format={_LOG_FORMAT}',
+                '--name-only', '--diff-merges=first-parent', head]
+        if exclude:
+            args.extend(['--not'] + exclude)
+        process = subprocess.Popen(args, cwd=self.repo.working_tree_dir or self.repo.git_dir,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   encoding='utf-8', errors='replace')
+        buffer = ''
+        while True:
+            data = process.stdout.read(1 << 20)
+            if not data:
+                break
+            buffer += data
+            records = buffer.split(_RECORD_SEP)
+            buffer = records.pop()
+            for raw in records:
+                record = _parse_record(raw)
+                if record:
+                    yield record
+        record = _parse_record(buffer)
+        if record:
+            yield record
+        stderr = process.stderr.read()
+        if process.wait() != 0:
+            raise RuntimeError(stderr.strip() or "git log failed")
+
+    def update(self, head: Optional[str] = None) -> str:
+        """Index commits reachable from head that are not cached yet. Returns the head SHA."""
+        with self._lock:
+            head = head or self.repo.head.commit.hexsha
+            # Commits em cache implicam que todo o seu histórico já foi indexado
+            if head in self.commits:
+                return head
+
+            with external_call("git", "log"):
+                try:
+                    new_records = list(self._walk(head, self.tips))
+                except RuntimeError:
+                    self.tips = self._valid_tips()
+                    new_records = list(self._walk(head, self.tips))
+
+            new_records = [record for record in new_records if record["sha"] not in self.commits]
+            for record in new_records:
+                self.commits[record["sha"]] = record
+                self._index_paths(record)
+            self.tips = ([head] + [tip for tip in self.tips if tip != head])[:MAX_TIPS]
+            self._save(new_records)
+            if new_records:
+                logger.info(f"Indexed {len(new_records)} new commits")
+            return head
+
+    def ordered(self, head: str) -> List[str]:
+        """SHAs reachable from head, newest first by commit date (like `git log`)"""
+        with self._lock:
+            cached = self._orderings.get(head)
+            if cached is not None:
+                return cached
+
+            order = []
+            seen = {head}
+            # O contador desempata commits com a mesma data na ordem em que foram alcançados
+            counter = 0
+            heap = [(-self.commits[head]["committed"], counter, head)] if head in self.commits else []
+            while heap:
+                _, _, sha = heapq.heappop(heap)
+                order.append(sha)
+                for parent in self.commits[sha]["parents"]:
+                    if parent in self.commits and parent not in seen:
+                        seen.add(parent)
+                        counter += 1
+                        heapq.heappush(heap, (-self.commits[parent]["committed"], counter, parent))
+
+            if len(self._orderings) >= MAX_ORDERINGS:
+                evicted = next(iter(self._orderings))
+                self._orderings.pop(evicted)
+                self._positions.pop(evicted, None)
+            self._orderings[head] = order
+            return order
+
+    def positions(self, head: str) -> Dict[str, int]:
+        """Map of SHA to its position in the history of head"""
+        with self._lock:
+            order = self.ordered(head)
+            positions = self._positions.get(head)
+            if positions is None:
+                positions = {sha: index for index, sha in enumerate(order)}
+                self._positions[head] = positions
+            return positions
+
+    def _index_paths(self, record: Dict) -> None:
+        for path in record["files"]:
+            self._paths.setdefault(path, []).append(record["sha"])
+
+    def path_commits(self, path: str) -> List[str]:
+        """SHAs of all indexed commits touching a file, or any file under a directory"""
+        with self._lock:
+            path = path.strip('/')
+            if path in self._paths:
+                return list(self._paths[path])
+            prefix = path + '/'
+            shas = set()
+            for indexed_path, indexed_shas in self._paths.items():
+                if indexed_path.startswith(prefix):
+                    shas.update(indexed_shas)
+            return list(shas)
+
+    def _resolve_cursor(self, cursor: Optional[str]) -> Tuple[str, int]:
+        if cursor:
+            # Cursores vêm do cliente: qualquer formato ou SHA inesperado vira ValueError
+            try:
+                head, offset = cursor.rsplit(':', 1)
+                offset = int(offset)
+                if offset < 0:
+                    raise ValueError(offset)
+                return self.repo.git.rev_parse('--verify', f"{head}^{{commit}}"), offset
+            except Exception as e:
+                raise ValueError("Cursor inválido") from e
+        return self.repo.head.commit.hexsha, 0
+
+    def query(self, limit: int = 5, cursor: Optional[str] = None, path: Optional[str] = None,
+              author: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """Return one page of commits and the cursor of the next page (None when done).
+
+        The cursor pins the HEAD the listing started from, so pages stay
+        stable while new commits arrive.
+        """
+        head, offset = self._resolve_cursor(cursor)
+        self.update(head)
+
+        since_ts, until_ts = _parse_date(since), _parse_date(until)
+        author = author.lower() if author else None
+
+        order = self.ordered(head)
+        if path:
+            # Usar o índice por caminho em vez de percorrer todo o histórico
+            head_positions = self.positions(head)
+            candidates = sorted(head_positions[sha] for sha in self.path_commits(path)
+                                if sha in head_positions and head_positions[sha] >= offset)
+        else:
+            candidates = range(offset, len(order))
+
+        page = []
+        position = offset
+        more = False
+        for candidate in candidates:
+            if len(page) >= limit:
+                more = True
+                break
+            record = self.commits[order[candidate]]
+            position = candidate + 1
+            if since_ts is not None and record["date"] < since_ts:
+                continue
+            if until_ts is not None and record["date"] > until_ts:
+                continue
+            if author and author not in record["author"].lower() and author not in record["email"].lower():
+                continue
+            page.append(record)
+
+        next_cursor = f"{head[:12]}:{position}" if more else None
+        return page, next_cursor
+
+    def blame(self, path: str, start_line: int, end_line: int) -> List[Dict]:
+        """Attribute a line range of a file at HEAD to the commits that last changed it.
+
+        Returns groups of consecutive lines with their commit record. Results
+        are cached by path, range and the last commit touching the path, so
+        they stay valid until the file changes again.
+        """
+        head = self.update()
+        head_positions = self.positions(head)
+        touching = [sha for sha in self.path_commits(path) if sha in head_positions]
+        if not touching:
+            return []
+        last_touch = min(touching, key=lambda sha: head_positions[sha])
+
+        cache = DiskCache("blame")
+        key = content_hash(path, last_touch, str(start_line), str(end_line))
+        groups = cache.get(key)
+        if groups is None:
+            with external_call("git", "blame"):
+                output = self.repo.git.blame('--porcelain', '-L', f"{start_line},{end_line}", head, '--', path)
+            groups = []
+            for line in output.split('\n'):
+                match = _BLAME_HEADER.match(line)
+                if not match:
+                    continue
+                sha, final_line = match.group(1), int(match.group(2))
+                if groups and groups[-1]["sha"] == sha and groups[-1]["end_line"] == final_line - 1:
+                    groups[-1]["end_line"] = final_line
+                else:
+                    groups.append({"sha": sha, "start_line": final_line, "end_line": final_line})
+            cache.set(key, groups)
+
+        return [dict(group, commit=self.commits.get(group["sha"])) for group in groups]
+
+_graphs: Dict[str, CommitGraph] = {}
+_graphs_lock = threading.Lock()
+
+def get_commit_graph(repo: "Repo") -> CommitGraph:
+    """Return the shared CommitGraph for a repository"""
+    key = os.path.abspath(repo.git_dir)
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is None:
+            graph = CommitGraph(repo)
+            _graphs[key] = graph
+        return graph
@@ -1,69 +1,308 @@
-from git import Repo
 import os
-from typing import List, Dict
+import subprocess
+import threading
+import time
+from datetime import datetime
+from typing import TYPE_CHECKING, Iterator, List, Dict, Optional, Tuple
+from .git_index import get_commit_graph
+from .metrics import external_call, record_cache
+
+# Tempo máximo (s) de reuso do status mesmo sem mudanças em HEAD/index,
+# já que edições no working tree não alteram esses arquivos
+STATUS_CACHE_TTL = 5
+
+# Limites padrão de paginação de diffs
+DEFAULT_PAGE_SIZE = 20
+DEFAULT_MAX_FILE_BYTES = 64 * 1024
+DEFAULT_MAX_TOTAL_BYTES = 512 * 1024
+
+if TYPE_CHECKING:
+    from git import Repo
+
+_repos: Dict[str, "Repo"] = {}
+_status_cache: Dict[str, Tuple[Tuple, float, Dict]] = {}
+_lock = threading.Lock()
+
+def get_repo(path: Optional[str] = None) -> Optional["Repo"]:
+    """Return a shared Repo handle for path (defaults to the current directory)"""
+    path = os.path.abspath(path or os.getcwd())
+    with _lock:
+        repo = _repos.get(path)
+        if repo is None:
+            try:
+                from git import Repo
+                repo = Repo(path)
+            except Exception:
+                return None
+            _repos[path] = repo
+        return repo
+
+def _mtime(path: str) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+def _status_signature(repo: "Repo") -> Tuple:
+    """Modification times that change whenever HEAD, the current ref or the index change"""
+    git_dir = repo.git_dir
+    head_path = os.path.join(git_dir, 'HEAD')
+    ref_mtime = 0
+    try:
+        with open(head_path, 'r') as f:
+            head = f.read().strip()
+        if head.startswith('ref: '):
+            ref_mtime = _mtime(os.path.join(repo.common_dir, head[5:]))
+    except OSError:
+        pass
+    return (_mtime(head_path), ref_mtime, _mtime(os.path.join(git_dir, 'index')))
+
+def _parse_status(output: str) -> Dict:
+    """Parse `git status --porcelain=v2 --branch -z` output into counts"""
+    status = {"branch": None, "ahead": 0, "behind": 0,
+              "staged": 0, "modified": 0, "untracked": 0}
+    entries = output.split('\0')
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if entry.startswith('# branch.head '):
+            status["branch"] = entry[len('# branch.head '):]
+        elif entry.startswith('# branch.ab '):
+            ahead, behind = entry[len('# branch.ab '):].split()
+            status["ahead"], status["behind"] = int(ahead), abs(int(behind))
+        elif entry[:2] in ('1 ', '2 '):
+            xy = entry[2:4]
+            if xy[0] != '.':
+                status["staged"] += 1
+            if xy[1] != '.':
+                status["modified"] += 1
+            if entry[0] == '2':
+                index += 1  # Entradas renomeadas trazem o caminho original a seguir
+        elif entry.startswith('u '):
+            status["modified"] += 1
+        elif entry.startswith('? '):
+            status["untracked"] += 1
+    return status
+
+def get_repo_status(repo: Optional["Repo"] = None) -> Dict:
+    """Get branch, ahead/behind and staged/modified/untracked counts in a single status pass.
+
+    Results are cached per repository until HEAD or the index change.
+    """
+    repo = repo or get_repo()
+    if not repo:
+        return {}
+
+    signature = _status_signature(repo)
+    key = repo.git_dir
+    with _lock:
+        cached = _status_cache.get(key)
+    if cached and cached[0] == signature and time.monotonic() - cached[1] < STATUS_CACHE_TTL:
+        record_cache("git_status", True)
+        return dict(cached[2])
+
+    record_cache("git_status", False)
+    with external_call("git", "status"):
+        output = repo.git.status('--porcelain=v2', '--branch', '-z', '--untracked-files=all')
+    status = _parse_status(output)
+    with _lock:
+        _status_cache[key] = (signature, time.monotonic(), status)
+    return dict(status)
 
 class GitTool:
     def __init__(self):
-        self.repo = None
-        try:
-            self.repo = Repo(os.getcwd())
-        except:
+        self.repo = get_repo()
+        if not self.repo:
             print("Not a git repository")
 
     def get_repo_info(self) -> Dict:
         """Get repository information."""
         if not self.repo:
             return {}
-        
-        active_branch = self.repo.active_branch
+
+        status = get_repo_status(self.repo)
+        try:
+            commit = self.repo.head.commit
+            last_commit, author = commit.hexsha[:7], str(commit.author)
+        except ValueError:
+            last_commit, author = "N/A", "N/A"  # Repositório sem commits
         remotes = [remote.url for remote in self.repo.remotes]
         return {
-            "branch": str(active_branch),
+            "branch": status["branch"],
             "remotes": remotes,
-            "last_commit": str(self.repo.head.commit.hexsha[:7]),
-            "author": str(self.repo.head.commit.author),
-            "untracked": len(self.repo.untracked_files),
-            "modified": len([item.a_path for item in self.repo.index.diff(None)]),
-            "staged": len([item.a_path for item in self.repo.index.diff("HEAD")])
+            "last_commit": last_commit,
+            "author": author,
+            "ahead": status["ahead"],
+            "behind": status["behind"],
+            "untracked": status["untracked"],
+            "modified": status["modified"],
+            "staged": status["staged"]
         }
 
-    def get_file_diffs(self) -> List[Dict]:
-        """Get diffs of modified files."""
+    def list_changed_files(self) -> List[Dict]:
+        """List unstaged and staged changes with line stats, without loading any diff."""
         if not self.repo:
             return []
-        
-        diffs = []
-        # Unstaged changes
-        for diff in self.repo.index.diff(None):
-            diffs.append({
-                "file": diff.a_path,
-                "status": "modified",
-                "staged": False,
-                "diff": diff.diff.decode('utf-8')
-            })
-        
-        # Staged changes
-        for diff in self.repo.index.diff("HEAD"):
-            diffs.append({
-                "file": diff.a_path,
-                "status": "staged",
-                "staged": True,
-                "diff": diff.diff.decode('utf-8')
-            })
-        
-        return diffs
-
-async def get_commit_history(limit: int = 5) -> str:
-    """Get the recent commit history."""
+
+        files = []
+        for staged in (False, True):
+            args = ['--cached'] if staged else []
+            with external_call("git", "diff_numstat"):
+                output = self.repo.git.diff(*args, '--numstat', '-z', '-M', '--no-color', '--no-ext-diff')
+            entries = output.split('\0')
+            index = 0
+            while index < len(entries):
+                entry = entries[index]
+                index += 1
+                if not entry:
+                    continue
+                added, deleted, path = entry.split('\t', 2)
+                old_path = None
+                if not path:
+                    # Renomeações: caminho antigo e novo vêm nas entradas seguintes
+                    old_path = entries[index]
+                    path = entries[index + 1] if index + 1 < len(entries) else old_path
+                    index += 2
+                binary = added == '-'
+                files.append({
+                    "file": path,
+                    "old_file": old_path,
+                    "status": "staged" if staged else "modified",
+                    "staged": staged,
+                    "added": 0 if binary else int(added),
+                    "deleted": 0 if binary else int(deleted),
+                    "binary": binary
+                })
+        return files
+
+    def _read_file_diff(self, path: str, staged: bool, max_bytes: int,
+                        old_path: Optional[str] = None) -> Tuple[str, bool, bool]:
+        """Stream the diff of one file, stopping after max_bytes.
+
+        For renames pass old_path too, so git pairs both sides instead of
+        showing the new file as fully added. Returns the decoded diff, whether
+        it was truncated and whether it looks binary.
+        """
+        args = ['git', 'diff', '-M', '--no-color', '--no-ext-diff']
+        if staged:
+            args.append('--cached')
+        args.append('--')
+        if old_path:
+            args.append(old_path)
+        args.append(path)
+        with external_call("git", "diff"):
+            process = subprocess.Popen(args, cwd=self.repo.working_tree_dir,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            try:
+                data = process.stdout.read(max_bytes + 1)
+                truncated = len(data) > max_bytes
+            finally:
+                if process.poll() is None:
+                    process.kill()
+                process.stdout.close()
+                process.wait()
+        data = data[:max_bytes]
+        if b'\0' in data:
+            return "", truncated, True
+        return data.decode('utf-8', errors='replace'), truncated, False
+
+    def iter_file_diffs(self, cursor: int = 0, page_size: int = DEFAULT_PAGE_SIZE,
+                        max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                        max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES,
+                        stat_only: bool = False, files: Optional[List[Dict]] = None) -> Iterator[Dict]:
+        """Yield file diffs one at a time, starting at cursor.
+
+        Stops after page_size files or once max_total_bytes of diff text was
+        produced. Each item carries its `index`, so the caller can resume
+        from `index + 1`.
+        """
+        files = self.list_changed_files() if files is None else files
+        total_bytes = 0
+        for index in range(max(cursor, 0), min(max(cursor, 0) + page_size, len(files))):
+            item = dict(files[index], index=index, diff="", truncated=False)
+            if not stat_only and not item["binary"]:
+                budget = min(max_file_bytes, max_total_bytes - total_bytes)
+                diff, truncated, binary = self._read_file_diff(item["file"], item["staged"], budget,
+                                                               item.get("old_file"))
+                item.update(diff=diff, truncated=truncated, binary=binary)
+                total_bytes += len(diff.encode('utf-8'))
+            yield item
+            if total_bytes >= max_total_bytes:
+                break
+
+    def get_file_diffs(self) -> List[Dict]:
+        """Get diffs of modified files (first page, size-bounded)."""
+        return list(self.iter_file_diffs())
+
+async def get_commit_history(limit: int = 5, cursor: Optional[str] = None, path: Optional[str] = None,
+                             author: Optional[str] = None, since: Optional[str] = None,
+                             until: Optional[str] = None) -> str:
+    """Get the commit history, one page at a time.
+
+    Optional filters: path (file or directory), author (name or email
+    substring) and since/until ISO dates. Pass the returned next cursor to
+    get the following page.
+    """
+    tool = GitTool()
+    if not tool.repo:
+        return "No git repository found"
+
+    try:
+        commits, next_cursor = get_commit_graph(tool.repo).query(limit, cursor, path, author, since, until)
+    except ValueError as e:
+        return f"Could not read commit history: {str(e)}"
+    if not commits:
+        return "No commits found"
+
+    result = [f"Commit: {c['sha'][:7]}\nAuthor: {c['author']}\nDate: {datetime.fromtimestamp(c['date']).isoformat()}\nMessage: {c['message']}"
+              for c in commits]
+    if next_cursor:
+        result.append(f"Next cursor: {next_cursor}")
+    return "\n\n".join(result)
+
+async def get_file_history(path: str, limit: int = 10, cursor: Optional[str] = None) -> str:
+    """List the commits that touched a file or directory, newest first, using the path index."""
+    tool = GitTool()
+    if not tool.repo:
+        return "No git repository found"
+
+    try:
+        commits, next_cursor = get_commit_graph(tool.repo).query(limit, cursor, path=path)
+    except ValueError as e:
+        return f"Could not read commit history: {str(e)}"
+    if not commits:
+        return f"No commits found for {path}"
+
+    result = [f"{c['sha'][:7]} {datetime.fromtimestamp(c['date']).strftime('%Y-%m-%d')} {c['author']}: {c['message'].splitlines()[0] if c['message'] else ''}"
+              for c in commits]
+    if next_cursor:
+        result.append(f"\nNext cursor: {next_cursor}")
+    return f"History of {path}:\n" + "\n".join(result)
+
+async def get_line_history(path: str, start_line: int, end_line: int) -> str:
+    """Show which commits last changed each part of a line range of a file (blame at HEAD)."""
     tool = GitTool()
     if not tool.repo:
         return "No git repository found"
-    
-    commits = []
-    for commit in tool.repo.iter_commits(max_count=limit):
-        commits.append(f"Commit: {commit.hexsha[:7]}\nAuthor: {commit.author}\nMessage: {commit.message}")
-    
-    return "\n\n".join(commits)
+
+    try:
+        groups = get_commit_graph(tool.repo).blame(path, start_line, end_line)
+    except Exception as e:
+        return f"Could not attribute lines of {path}: {str(e)}"
+    if not groups:
+        return f"No history found for {path}"
+
+    result = []
+    for group in groups:
+        commit = group['commit']
+        if commit:
+            summary = commit['message'].splitlines()[0] if commit['message'] else ''
+            details = f"{commit['author']} {datetime.fromtimestamp(commit['date']).strftime('%Y-%m-%d')}: {summary}"
+        else:
+            details = "not committed yet"
+        result.append(f"Lines {group['start_line']}-{group['end_line']}: {group['sha'][:7]} {details}")
+    return f"Line history of {path}:{start_line}-{end_line}:\n" + "\n".join(result)
 
 async def get_issues() -> str:
     """Get open issues from the repository."""
@@ -94,24 +333,51 @@ async def get_repo_info() -> str:
 Branch: {info['branch']}
 Last Commit: {info['last_commit']} by {info['author']}
 Remotes: {', '.join(info['remotes']) if info['remotes'] else 'No remotes'}
+Ahead/Behind: {info['ahead']} ahead, {info['behind']} behind upstream
 Status:
 - {info['untracked']} untracked files
 - {info['modified']} modified files
 - {info['staged']} staged changes"""
 
-async def get_diffs() -> str:
-    """Get formatted diff information."""
-    tool = GitTool()
-    diffs = tool.get_file_diffs()
-    if not diffs:
-        return "No changes found"
-    
-    result = []
-    for diff in diffs:
-        result.append(f"""File: {diff['file']}
+def format_file_diff(diff: Dict) -> str:
+    """Format a single file diff produced by GitTool.iter_file_diffs"""
+    name = f"{diff['old_file']} → {diff['file']}" if diff.get('old_file') else diff['file']
+    header = f"""File: {name}
 Status: {diff['status']} ({'staged' if diff['staged'] else 'unstaged'})
+Stats: +{diff['added']} -{diff['deleted']}"""
+    if diff['binary']:
+        return f"{header}\nChanges: binary file, diff omitted\n---"
+    if not diff['diff']:
+        return f"{header}\n---"
+    note = "\n[... diff truncated ...]" if diff['truncated'] else ""
+    return f"""{header}
 Changes:
-{diff['diff']}
----""")
-    
-    return "\n\n".join(result)
\ No newline at end of file
+{diff['diff']}{note}
+---"""
+
+def format_diff_page_footer(shown: int, cursor: int, total: int) -> str:
+    """Describe the current page and how to fetch the next one"""
+    if shown == 0:
+        return f"No files at cursor {cursor} ({total} changed files)"
+    footer = f"Files {cursor + 1}-{cursor + shown} of {total}"
+    if cursor + shown < total:
+        footer += f". Next cursor: {cursor + shown}"
+    return footer
+
+async def get_diffs(cursor: int = 0, page_size: int = DEFAULT_PAGE_SIZE, stat_only: bool = False,
+                    max_file_bytes: int = DEFAULT_MAX_FILE_BYTES,
+                    max_total_bytes: int = DEFAULT_MAX_TOTAL_BYTES) -> str:
+    """Get formatted diff information, one page at a time.
+
+    Use the returned next cursor to fetch the following files. With stat_only
+    only line counts are returned.
+    """
+    tool = GitTool()
+    files = tool.list_changed_files()
+    if not files:
+        return "No changes found"
+
+    result = [format_file_diff(diff) for diff in tool.iter_file_diffs(
+        cursor, page_size, max_file_bytes, max_total_bytes, stat_only, files=files)]
+    result.append(format_diff_page_footer(len(result), cursor, len(files)))
+    return "\n\n".join(result)
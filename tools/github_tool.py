@@ -1,21 +1,73 @@
-from github import Github, GithubException
 import os
-from typing import Dict, List, Optional
-from tree_sitter import Parser
+import asyncio
+import fnmatch
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import logging
 import base64
-import ollama
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from .memory_tool import add_memory
+from .cache import DiskCache, content_hash
+from .code_chunker import estimate_tokens, split_into_chunks
+from .config import get_context_window
+from .metrics import external_call, record_llm_usage
+from .profiling import propagate
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+# Tokens reservados para a resposta do modelo em cada trecho analisado
+RESPONSE_TOKEN_RESERVE = 1024
+# Número máximo de trechos analisados em paralelo pelo Ollama
+MAX_CONCURRENT_ANALYSES = 4
+# Incrementar ao mudar o prompt para invalidar análises em cache
+ANALYSIS_PROMPT_VERSION = "2"
+# Sem posição nem número de partes: editar outra parte do arquivo não invalida esta
+PART_NOTE = "\nThis is one part of a larger file. Focus on this part.\n"
+
+ANALYSIS_PROMPT = """You are a code analysis expert. Analyze the following {language} code and provide:
+1. A high-level overview of what the code does
+2. Key components and their responsibilities
+3. Notable patterns or techniques used
+4. Potential improvements or best practices that could be applied
+5. Any security considerations if relevant
+{part_note}
+Here's the code to analyze:
+
+{content}
+"""
+
+_github_client = None
+_github_lock = threading.Lock()
+
+def get_github_client():
+    """Create the shared PyGithub client on first use"""
+    global _github_client
+    with _github_lock:
+        if _github_client is None:
+            from github import Github
+            # GITHUB_API_URL permite usar GitHub Enterprise ou o servidor falso dos benchmarks
+            _github_client = Github(os.getenv('GITHUB_TOKEN'),
+                                    base_url=os.getenv('GITHUB_API_URL', DEFAULT_GITHUB_API_URL))
+    return _github_client
+
 class GithubTool:
     def __init__(self):
-        self.gh = Github(os.getenv('GITHUB_TOKEN'))
-        self.parser = Parser()
+        self._parser = None
         self.model = "codellama" # Default model for code-related tasks
 
+    @property
+    def gh(self):
+        return get_github_client()
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            from tree_sitter import Parser
+            self._parser = Parser()
+        return self._parser
+
     def analyze_code(self, content: str, language: str = 'python') -> Dict:
         """Analyze code content using basic parsing"""
         try:
@@ -91,66 +143,108 @@ class GithubTool:
 
 Issue to summarize:
 """
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt + text
-                }],
-                stream=False
-            )
+            import ollama
+
+            with external_call("ollama", "chat"):
+                response = ollama.chat(
+                    model=self.model,
+                    messages=[{
+                        'role': 'user',
+                        'content': prompt + text
+                    }],
+                    stream=False
+                )
+            record_llm_usage(self.model, response)
             return response['message']['content'].strip()
         except Exception as e:
             logger.error(f"Error summarizing text: {e}")
             return "Não foi possível gerar um resumo."
 
     def analyze_code_with_ai(self, content: str, language: str = 'python') -> str:
-        """Use Ollama to provide an intelligent analysis of the code"""
+        """Use Ollama to provide an intelligent analysis of the code.
+
+        Files that do not fit the model context window are split along
+        function/class boundaries and the parts are analyzed concurrently.
+        """
         try:
             print("🤖 Iniciando análise com CodeLlama...")
             print("⏳ Analisando código, por favor aguarde...")
-            
-            prompt = f"""You are a code analysis expert. Analyze the following {language} code and provide:
-1. A high-level overview of what the code does
-2. Key components and their responsibilities
-3. Notable patterns or techniques used
-4. Potential improvements or best practices that could be applied
-5. Any security considerations if relevant
 
-Here's the code to analyze:
+            chunks = split_into_chunks(content, language, self._chunk_token_budget(language))
+            if len(chunks) > 1:
+                print(f"📦 Arquivo grande: analisando {len(chunks)} partes em paralelo...")
 
-{content}
-"""
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_ANALYSES, len(chunks))) as executor:
+                results = list(executor.map(
+                    propagate(lambda chunk: self._analyze_chunk(chunk, language, len(chunks) > 1)), chunks
+                ))
+            print("✅ Análise concluída!")
+
+            if len(chunks) == 1:
+                return results[0]
+            sections = []
+            for index, (chunk, result) in enumerate(zip(chunks, results), 1):
+                names = f" - {', '.join(chunk['names'])}" if chunk['names'] else ""
+                sections.append(f"### Parte {index}/{len(chunks)} (linhas {chunk['start_line']}-{chunk['end_line']}{names})\n{result}")
+            return "\n\n".join(sections)
+        except Exception as e:
+            logger.error(f"Error analyzing code with AI: {e}")
+            return f"Erro ao analisar código: {str(e)}"
+
+    def _chunk_token_budget(self, language: str) -> int:
+        """Tokens available for code in a single prompt"""
+        overhead = estimate_tokens(ANALYSIS_PROMPT.format(language=language, part_note=PART_NOTE, content=""))
+        return max(get_context_window(self.model) - RESPONSE_TOKEN_RESERVE - overhead, 256)
+
+    def _analyze_chunk(self, chunk: Dict, language: str, is_part: bool) -> str:
+        """Analyze one chunk of a file, reusing cached results for identical content.
+
+        The prompt does not mention the chunk's position, so the cached result
+        stays valid when edits elsewhere shift lines or change the number of
+        parts; the line range only goes into the merged report headings.
+        """
+        import ollama
+
+        part_note = PART_NOTE if is_part else ""
+        cache = DiskCache("code_analysis")
+        key = content_hash(ANALYSIS_PROMPT_VERSION, self.model, language, part_note, chunk['content'])
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+        prompt = ANALYSIS_PROMPT.format(language=language, part_note=part_note, content=chunk['content'])
+        with external_call("ollama", "chat"):
             response = ollama.chat(
                 model=self.model,
                 messages=[{
                     'role': 'user',
                     'content': prompt
                 }],
+                options={'num_ctx': get_context_window(self.model)},
                 stream=False
             )
-            print("✅ Análise concluída!")
-            return response['message']['content'].strip()
-        except Exception as e:
-            logger.error(f"Error analyzing code with AI: {e}")
-            return f"Erro ao analisar código: {str(e)}"
+        record_llm_usage(self.model, response)
+        result = response['message']['content'].strip()
+        cache.set(key, result)
+        return result
 
 async def get_repo_details(repo_name: str) -> str:
     """Get detailed information about a GitHub repository"""
     try:
         tool = GithubTool()
-        repo = tool.gh.get_repo(repo_name)
-
-        # Coletar informações básicas
-        info = {
-            "name": repo.name,
-            "description": repo.description,
-            "stars": repo.stargazers_count,
-            "forks": repo.forks_count,
-            "open_issues": repo.open_issues_count,
-            "language": repo.language,
-            "topics": repo.get_topics()
-        }
+        with external_call("github", "get_repo"):
+            repo = tool.gh.get_repo(repo_name)
+
+            # Coletar informações básicas
+            info = {
+                "name": repo.name,
+                "description": repo.description,
+                "stars": repo.stargazers_count,
+                "forks": repo.forks_count,
+                "open_issues": repo.open_issues_count,
+                "language": repo.language,
+                "topics": repo.get_topics()
+            }
 
         return f"""Repository: {info['name']}
 Description: {info['description']}
@@ -164,13 +258,15 @@ async def get_repository_issues(repo_name: str, state: str = "open") -> str:
     """Get issues from a GitHub repository"""
     try:
         tool = GithubTool()
-        repo = tool.gh.get_repo(repo_name)
-        issues = repo.get_issues(state=state)
+        with external_call("github", "get_issues"):
+            repo = tool.gh.get_repo(repo_name)
+            # Limitar a 10 issues para não sobrecarregar
+            issues = list(repo.get_issues(state=state)[:10])
 
         result = []
         result.append(f"\nIssues do repositório {repo_name} ({state}):\n")
         
-        for issue in issues[:10]:  # Limitar a 10 issues para não sobrecarregar
+        for issue in issues:
             result.append(f"""📎 Issue #{issue.number}
 Título: {issue.title}
 Status: {issue.state}
@@ -217,11 +313,13 @@ async def search_github_code(query: str, language: Optional[str] = None) -> str:
         if language:
             query_str += f" language:{language}"
 
-        results = tool.gh.search_code(query_str)
+        with external_call("github", "search_code"):
+            # Limitar a 5 resultados; o conteúdo de cada arquivo é outra requisição
+            items = [(item, item.content) for item in tool.gh.search_code(query_str)[:5]]
         found = []
 
-        for item in results[:5]:  # Limitar a 5 resultados
-            content = base64.b64decode(item.content).decode('utf-8')
+        for item, encoded in items:
+            content = base64.b64decode(encoded).decode('utf-8')
             found.append(f"""File: {item.path}
 Repository: {item.repository.full_name}
 URL: {item.html_url}
@@ -237,17 +335,19 @@ async def get_pull_requests(repo_name: str, state: str = "open") -> str:
     """Get pull requests from a GitHub repository"""
     try:
         tool = GithubTool()
-        repo = tool.gh.get_repo(repo_name)
-        prs = repo.get_pulls(state=state)
+        with external_call("github", "get_pulls"):
+            repo = tool.gh.get_repo(repo_name)
+            # Limitar a 10 PRs
+            prs = [(pr, pr.get_reviews().totalCount) for pr in repo.get_pulls(state=state)[:10]]
 
         result = []
-        for pr in prs[:10]:  # Limitar a 10 PRs
+        for pr, reviews in prs:
             result.append(f"""#{pr.number} - {pr.title}
 Status: {pr.state}
 Autor: {pr.user.login}
 Criado em: {pr.created_at}
 Branch: {pr.head.ref} → {pr.base.ref}
-Reviews: {pr.get_reviews().totalCount}
+Reviews: {reviews}
 {pr.html_url}
 """)
 
@@ -259,44 +359,51 @@ async def get_project_info(org_name: str, project_number: int) -> str:
     """Get information about a GitHub Project (Project V2)"""
     try:
         tool = GithubTool()
-        org = tool.gh.get_organization(org_name)
-        projects = org.get_projects(state='open')
-
-        for project in projects:
-            if project.number == project_number:
-                columns = project.get_columns()
-                result = [f"Projeto: {project.name}\nDescrição: {project.body or 'N/A'}\n\nColunas:"]
-
-                for column in columns:
-                    cards = column.get_cards()
-                    items = [f"- {card.get_content().title if card.get_content() else card.note}" 
-                            for card in cards[:5]]  # Limitar a 5 cards por coluna
-                    result.append(f"\n{column.name} ({cards.totalCount} items):")
-                    result.extend(items)
-                    if cards.totalCount > 5:
-                        result.append("  ...")
-
-                return "\n".join(result)
-
-        return "Projeto não encontrado"
+        with external_call("github", "get_project"):
+            org = tool.gh.get_organization(org_name)
+            project = next((project for project in org.get_projects(state='open')
+                            if project.number == project_number), None)
+            if project is None:
+                return "Projeto não encontrado"
+
+            columns = []
+            for column in project.get_columns():
+                cards = column.get_cards()
+                items = []
+                for card in cards[:5]:  # Limitar a 5 cards por coluna
+                    content = card.get_content()
+                    items.append(f"- {content.title if content else card.note}")
+                columns.append((column.name, cards.totalCount, items))
+
+        result = [f"Projeto: {project.name}\nDescrição: {project.body or 'N/A'}\n\nColunas:"]
+        for name, total, items in columns:
+            result.append(f"\n{name} ({total} items):")
+            result.extend(items)
+            if total > 5:
+                result.append("  ...")
+
+        return "\n".join(result)
     except Exception as e:
         return f"Erro ao buscar informações do projeto: {str(e)}"
 
 async def summarize_issue(repo_name: str, issue_number: int) -> str:
     """Get and summarize a GitHub issue"""
+    from github import GithubException
+
     try:
         tool = GithubTool()
-        repo = tool.gh.get_repo(repo_name)
-        
-        try:
-            issue = repo.get_issue(issue_number)
-        except GithubException as e:
-            if e.status == 404:
-                return f"Issue #{issue_number} não encontrada no repositório {repo_name}"
-            raise e
-
-        # Preparar o contexto completo da issue
-        comments = [comment.body for comment in issue.get_comments()]
+        with external_call("github", "get_issue"):
+            repo = tool.gh.get_repo(repo_name)
+
+            try:
+                issue = repo.get_issue(issue_number)
+            except GithubException as e:
+                if e.status == 404:
+                    return f"Issue #{issue_number} não encontrada no repositório {repo_name}"
+                raise e
+
+            # Preparar o contexto completo da issue
+            comments = [comment.body for comment in issue.get_comments()]
         full_context = f"""Título: {issue.title}
 Descrição: {issue.body}
 
@@ -330,4 +437,161 @@ Labels: {', '.join(label.name for label in issue.labels)}
 URL: {issue.html_url}"""
         
     except Exception as e:
-        return f"Erro ao resumir issue: {str(e)}"
\ No newline at end of file
+        return f"Erro ao resumir issue: {str(e)}"
+
+# Consultas em lote em vários repositórios
+
+# Número máximo de repositórios consultados ao mesmo tempo
+MAX_CONCURRENT_REPOS = 8
+
+def _resolve_repos(tool: GithubTool, repo_names: Optional[List[str]], org: Optional[str],
+                   repo_filter: Optional[str]) -> Dict[str, Any]:
+    """Build the repositories from explicit names or an organization plus a name filter.
+
+    Returns full names mapped to Repository objects: the complete objects
+    returned by the organization listing, and lazy ones (no request until an
+    attribute is read) for explicit names.
+    """
+    repos = {name: tool.gh.get_repo(name, lazy=True) for name in repo_names or []}
+    if org:
+        with external_call("github", "list_org_repos"):
+            for repo in tool.gh.get_organization(org).get_repos():
+                if repo.archived:
+                    continue
+                if repo_filter and not fnmatch.fnmatch(repo.name, repo_filter):
+                    continue
+                repos[repo.full_name] = repo
+    return repos
+
+async def _fan_out(repo_names: List[str], fetch: Callable[[str], List[Dict]],
+                   operation: str) -> Tuple[List[Dict], List[str]]:
+    """Run fetch for every repository in threads, at most MAX_CONCURRENT_REPOS at a time.
+
+    Progress is printed as each repository finishes. Returns all items and
+    the error messages of repositories that failed.
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REPOS)
+
+    def timed_fetch(repo_name: str) -> List[Dict]:
+        with external_call("github", operation):
+            return fetch(repo_name)
+
+    async def run(repo_name: str):
+        async with semaphore:
+            try:
+                return repo_name, await asyncio.to_thread(timed_fetch, repo_name)
+            except Exception as e:
+                raise RuntimeError(f"{repo_name}: {str(e)}") from e
+
+    items, errors = [], []
+    tasks = [asyncio.ensure_future(run(name)) for name in repo_names]
+    for completed in asyncio.as_completed(tasks):
+        try:
+            repo_name, repo_items = await completed
+            items.extend(repo_items)
+            print(f"✓ {repo_name}: {len(repo_items)}")
+        except Exception as e:
+            errors.append(str(e))
+    return items, errors
+
+def _batch_footer(errors: List[str]) -> str:
+    return "\n\nErros:\n" + "\n".join(f"⚠️ {error}" for error in errors) if errors else ""
+
+async def get_repos_details_batch(repo_names: Optional[List[str]] = None, org: Optional[str] = None,
+                                  repo_filter: Optional[str] = None) -> str:
+    """Get details of several GitHub repositories (a list of owner/repo, or an org plus a name filter such as 'service-*'), sorted by stars"""
+    try:
+        tool = GithubTool()
+        repos = _resolve_repos(tool, repo_names, org, repo_filter)
+        if not repos:
+            return "Nenhum repositório informado"
+
+        def fetch(repo_name: str) -> List[Dict]:
+            repo = repos[repo_name]
+            return [{
+                "repo": repo.full_name,
+                "stars": repo.stargazers_count,
+                "forks": repo.forks_count,
+                "open_issues": repo.open_issues_count,
+                "language": repo.language,
+                "description": repo.description
+            }]
+
+        items, errors = await _fan_out(list(repos), fetch, "get_repo")
+        items.sort(key=lambda item: item["stars"], reverse=True)
+        lines = [f"{item['repo']} ★{item['stars']} | Forks: {item['forks']} | Open Issues: {item['open_issues']} | {item['language'] or 'N/A'}\n  {item['description'] or ''}"
+                 for item in items]
+        return f"Repositórios ({len(items)}):\n\n" + "\n".join(lines) + _batch_footer(errors)
+    except Exception as e:
+        return f"Error getting repository details: {str(e)}"
+
+async def get_issues_batch(repo_names: Optional[List[str]] = None, org: Optional[str] = None,
+                           repo_filter: Optional[str] = None, state: str = "open",
+                           limit_per_repo: int = 10) -> str:
+    """Get issues from several GitHub repositories at once, merged and sorted by creation date (newest first)"""
+    try:
+        tool = GithubTool()
+        repos = _resolve_repos(tool, repo_names, org, repo_filter)
+        if not repos:
+            return "Nenhum repositório informado"
+
+        def fetch(repo_name: str) -> List[Dict]:
+            items = []
+            for issue in repos[repo_name].get_issues(state=state):
+                if len(items) >= limit_per_repo:
+                    break
+                if issue.pull_request is not None:
+                    continue  # A API de issues também retorna pull requests
+                items.append({
+                    "repo": repo_name,
+                    "number": issue.number,
+                    "title": issue.title,
+                    "state": issue.state,
+                    "created_at": issue.created_at,
+                    "labels": [label.name for label in issue.labels],
+                    "url": issue.html_url
+                })
+            return items
+
+        items, errors = await _fan_out(list(repos), fetch, "get_issues")
+        if not items:
+            return f"Nenhuma issue encontrada com status '{state}'" + _batch_footer(errors)
+        items.sort(key=lambda item: item["created_at"], reverse=True)
+        lines = [f"📎 {item['repo']}#{item['number']} [{item['created_at'].strftime('%d/%m/%Y')}] {item['title']}"
+                 f"{' (' + ', '.join(item['labels']) + ')' if item['labels'] else ''}\n   {item['url']}"
+                 for item in items]
+        return f"Issues ({state}) em {len(repos)} repositórios:\n\n" + "\n".join(lines) + _batch_footer(errors)
+    except Exception as e:
+        return f"Erro ao buscar issues: {str(e)}"
+
+async def get_pull_requests_batch(repo_names: Optional[List[str]] = None, org: Optional[str] = None,
+                                  repo_filter: Optional[str] = None, state: str = "open",
+                                  limit_per_repo: int = 10) -> str:
+    """Get pull requests from several GitHub repositories at once, merged and sorted by creation date (newest first)"""
+    try:
+        tool = GithubTool()
+        repos = _resolve_repos(tool, repo_names, org, repo_filter)
+        if not repos:
+            return "Nenhum repositório informado"
+
+        def fetch(repo_name: str) -> List[Dict]:
+            pulls = repos[repo_name].get_pulls(state=state)
+            return [{
+                "repo": repo_name,
+                "number": pr.number,
+                "title": pr.title,
+                "author": pr.user.login,
+                "created_at": pr.created_at,
+                "branch": f"{pr.head.ref} → {pr.base.ref}",
+                "url": pr.html_url
+            } for pr in pulls[:limit_per_repo]]
+
+        items, errors = await _fan_out(list(repos), fetch, "get_pulls")
+        if not items:
+            return "Nenhum Pull Request encontrado" + _batch_footer(errors)
+        items.sort(key=lambda item: item["created_at"], reverse=True)
+        lines = [f"{item['repo']}#{item['number']} - {item['title']} ({item['author']}, {item['created_at'].strftime('%d/%m/%Y')})\n   {item['branch']} {item['url']}"
+                 for item in items]
+        return f"Pull Requests ({state}) em {len(repos)} repositórios:\n\n" + "\n".join(lines) + _batch_footer(errors)
+    except Exception as e:
+        return f"Erro ao buscar Pull Requests: {str(e)}"
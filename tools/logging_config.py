@@ -0,0 +1,121 @@
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+DEFAULT_LOG_FILE = 'logs/agent.log'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# Handlers que gravam de fato (arquivo, console); alimentados pelos QueueListeners
+_output_handlers: List[logging.Handler] = []
+
+class SamplingFilter(logging.Filter):
+    """Let through one in every N records at or below a level, counted per call site.
+
+    Higher levels always pass. The first record of each call site is kept so
+    rare debug events are never lost entirely.
+    """
+
+    def __init__(self, rate: float, level: int = logging.DEBUG):
+        super().__init__()
+        self.every = max(int(round(1 / rate)), 1) if rate > 0 else 0
+        self.level = level
+        self._counts: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.level or self.every == 1:
+            return True
+        if not self.every:
+            return False
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+def _level(value, default: int = logging.INFO) -> int:
+    if isinstance(value, int):
+        return value
+    if not value:
+        return default
+    level = logging.getLevelName(str(value).upper())
+    if not isinstance(level, int):
+        # Nomes desconhecidos viram "Level X", que setLevel rejeitaria
+        logger.warning(f"Unknown log level {value!r}, using {logging.getLevelName(default)}")
+        return default
+    return level
+
+def _apply_levels(settings: Dict) -> None:
+    """Root level from `level`, per-logger levels from `modules`"""
+    logging.getLogger().setLevel(_level(settings.get('level')))
+    for name, level in settings.get('modules', {}).items():
+        logging.getLogger(name).setLevel(_level(level))
+
+def _install(log_queue, settings: Dict) -> None:
+    """Replace the root handlers by a single non-blocking queue handler"""
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    handler = logging.handlers.QueueHandler(log_queue)
+    rate = settings.get('debug_sample_rate', 1.0)
+    if rate < 1:
+        handler.addFilter(SamplingFilter(rate))
+    root.addHandler(handler)
+    _apply_levels(settings)
+
+def _file_handler(settings: Dict) -> logging.Handler:
+    path = Path(settings.get('file', DEFAULT_LOG_FILE))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    backup_count = settings.get('backup_count', DEFAULT_BACKUP_COUNT)
+    if settings.get('rotation', 'size') == 'time':
+        return logging.handlers.TimedRotatingFileHandler(
+            path, when=settings.get('when', 'midnight'), backupCount=backup_count, encoding='utf-8')
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=settings.get('max_bytes', DEFAULT_MAX_BYTES), backupCount=backup_count, encoding='utf-8')
+
+def configure_logging(settings: Dict) -> Optional[logging.handlers.QueueListener]:
+    """Configure logging from the `logging` section of .agent.json.
+
+    Callers only enqueue records; a background listener thread formats them
+    and writes to the rotating log file and the console.
+    """
+    if not settings.get('enabled', True):
+        logging.getLogger().addHandler(logging.NullHandler())
+        return None
+
+    formatter = logging.Formatter(settings.get('format', DEFAULT_FORMAT))
+    handlers = [_file_handler(settings)]
+    if settings.get('console', True):
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    _output_handlers[:] = handlers
+
+    log_queue = queue.SimpleQueue()
+    _install(log_queue, settings)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+def start_process_listener(context) -> Tuple[object, Optional[logging.handlers.QueueListener]]:
+    """Queue for child processes' records, written by this process's handlers"""
+    if not _output_handlers:
+        return None, None
+    log_queue = context.Queue()
+    listener = logging.handlers.QueueListener(log_queue, *_output_handlers, respect_handler_level=True)
+    listener.start()
+    return log_queue, listener
+
+def configure_worker_logging(log_queue, settings: Dict) -> None:
+    """Pool initializer: send the worker's records to the parent through log_queue"""
+    if log_queue is not None:
+        _install(log_queue, settings)
@@ -1,10 +1,92 @@
-import chromadb
 import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
+from .cache import content_hash
+from .config import load_agent_config
+from .metrics import external_call
 
-client = chromadb.Client()
-collection = client.get_or_create_collection("memory")
+_client = None
+_collection = None
+_lock = threading.Lock()
+# Tempo máximo para o servidor local do chromadb começar a aceitar conexões
+MEMORY_SERVER_TIMEOUT = 30
+
+def create_client():
+    """Create the chromadb client configured in the `memory` section of .agent.json.
+
+    `host`/`port` (or the MCP_DEV_AGENT_MEMORY_HOST/PORT variables) use a
+    chromadb server, the only store safe to share between processes.
+    `persist_directory` (or MCP_DEV_AGENT_MEMORY_DIR) keeps memories on disk
+    for a single process. Otherwise memories live in this process only.
+    """
+    import chromadb
+
+    settings = load_agent_config().get('memory', {})
+    host = os.getenv('MCP_DEV_AGENT_MEMORY_HOST') or settings.get('host')
+    if host:
+        port = int(os.getenv('MCP_DEV_AGENT_MEMORY_PORT') or settings.get('port', 8000))
+        return chromadb.HttpClient(host=host, port=port)
+    persist_directory = os.getenv('MCP_DEV_AGENT_MEMORY_DIR') or settings.get('persist_directory')
+    if persist_directory:
+        return chromadb.PersistentClient(path=persist_directory)
+    return chromadb.Client()
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def start_memory_server(path: str, timeout: float = MEMORY_SERVER_TIMEOUT) -> Tuple[subprocess.Popen, int]:
+    """Start a local chromadb server on path and wait until it accepts connections.
+
+    Used when several processes need the same memories: a PersistentClient
+    per process keeps its own in-memory index and is not safe for concurrent
+    writers. Returns the server process and its port.
+    """
+    executable = shutil.which('chroma', path=os.path.dirname(sys.executable)) or shutil.which('chroma')
+    if not executable:
+        raise RuntimeError("Comando 'chroma' não encontrado; configure memory.host para usar um servidor do ChromaDB")
+    os.makedirs(path, exist_ok=True)
+    port = _free_port()
+    log_file = open(os.path.join(path, 'server.log'), 'a')
+    process = subprocess.Popen([executable, 'run', '--path', path, '--host', '127.0.0.1', '--port', str(port)],
+                               stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT)
+    log_file.close()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Servidor do ChromaDB encerrou ao iniciar (veja {path}/server.log)")
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Servidor do ChromaDB não respondeu em {timeout}s")
+
+def get_client():
+    """Create the chromadb client on first use"""
+    global _client
+    with _lock:
+        if _client is None:
+            _client = create_client()
+    return _client
+
+def get_collection():
+    """Create the chromadb client and memory collection on first use"""
+    global _collection
+    client = get_client()
+    with _lock:
+        if _collection is None:
+            _collection = client.get_or_create_collection("memory")
+    return _collection
 
 async def add_memory(content: str, context_type: str = "general", metadata: Optional[Dict] = None) -> str:
     """Add a memory to the database with context type and metadata."""
@@ -17,12 +99,14 @@ async def add_memory(content: str, context_type: str = "general", metadata: Opti
         "context_type": context_type
     })
     
-    memory_id = f"mem-{hash(content)}-{context_type}"
-    collection.add(
-        documents=[content],
-        ids=[memory_id],
-        metadatas=[metadata]
-    )
+    # Hash estável entre processos para que workers compartilhem os mesmos IDs
+    memory_id = f"mem-{content_hash(content)[:16]}-{context_type}"
+    with external_call("chromadb", "add"):
+        get_collection().add(
+            documents=[content],
+            ids=[memory_id],
+            metadatas=[metadata]
+        )
     
     return f"Memory added [{context_type}]: {content[:100]}..."
 
@@ -30,11 +114,12 @@ async def get_memory(query: str, context_type: Optional[str] = None) -> str:
     """Retrieve memories from the database with optional context type filter."""
     where_filter = {"context_type": context_type} if context_type else None
     
-    results = collection.query(
-        query_texts=[query],
-        n_results=3,
-        where=where_filter
-    )
+    with external_call("chromadb", "query"):
+        results = get_collection().query(
+            query_texts=[query],
+            n_results=3,
+            where=where_filter
+        )
     
     if not results['documents'][0]:
         return "No memory found."
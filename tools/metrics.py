@@ -0,0 +1,224 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+from .profiling import span
+
+# Limites (em segundos) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "mcp_tool_duration_seconds": "Latency of MCP tool calls",
+    "mcp_tool_errors_total": "MCP tool calls that raised an exception",
+    "mcp_tool_coalesced_total": "Tool calls that shared an identical in-flight execution",
+    "mcp_command_duration_seconds": "Latency of CLI commands",
+    "mcp_external_duration_seconds": "Latency of calls to GitHub, Ollama, chromadb and git",
+    "mcp_external_errors_total": "Failed calls to external services",
+    "mcp_cache_hits_total": "Cache lookups that found an entry",
+    "mcp_cache_misses_total": "Cache lookups that found no entry",
+    "mcp_llm_prompt_tokens_total": "Prompt tokens evaluated by the local model",
+    "mcp_llm_completion_tokens_total": "Tokens generated by the local model",
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _labels(values: Dict[str, str]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in values.items()))
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Labels, extra: Dict[str, str] = None) -> str:
+    pairs = list(labels) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+class MetricsRegistry:
+    """In-process counters and latency histograms, rendered in Prometheus text format"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Dict] = {}
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "max": 0.0}
+                self._histograms[key] = histogram
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+            histogram["max"] = max(histogram["max"], value)
+
+    def drain(self) -> Dict:
+        """Return everything recorded so far as plain data and reset the registry"""
+        with self._lock:
+            data = {
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, list(labels), histogram] for (name, labels), histogram in self._histograms.items()],
+            }
+            self._counters, self._histograms = {}, {}
+        return data
+
+    def merge(self, data: Dict) -> None:
+        """Add data produced by drain() in another process (e.g. a worker)"""
+        with self._lock:
+            for name, labels, value in data.get("counters", []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                self._counters[key] = self._counters.get(key, 0) + value
+            for name, labels, other in data.get("histograms", []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                histogram = self._histograms.setdefault(
+                    key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0, "max": 0.0})
+                histogram["buckets"] = [a + b for a, b in zip(histogram["buckets"], other["buckets"])]
+                histogram["sum"] += other["sum"]
+                histogram["count"] += other["count"]
+                histogram["max"] = max(histogram["max"], other["max"])
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._histograms.items()}
+
+        lines: List[str] = []
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value:g}")
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f"# HELP {name} {HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': f'{bound:g}'})} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {histogram['count']}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def _percentile(self, histogram: Dict, fraction: float) -> float:
+        """Estimate a percentile as the upper bound of the bucket containing it"""
+        target = histogram["count"] * fraction
+        for bound, count in zip(self.buckets, histogram["buckets"]):
+            if count >= target:
+                return min(bound, histogram["max"])
+        return histogram["max"]
+
+    def render_summary(self) -> str:
+        """Human-readable summary used by the /stats CLI command"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+        if not counters and not histograms:
+            return "Nenhuma métrica registrada ainda."
+
+        def counter(name: str, labels: Labels) -> float:
+            return counters.get((name, labels), 0)
+
+        sections = []
+        for title, name, errors_name in (
+            ("Ferramentas MCP", "mcp_tool_duration_seconds", "mcp_tool_errors_total"),
+            ("Comandos CLI", "mcp_command_duration_seconds", None),
+            ("Serviços externos", "mcp_external_duration_seconds", "mcp_external_errors_total"),
+        ):
+            rows = []
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name or not histogram["count"]:
+                    continue
+                values = dict(labels)
+                label = f"{values['service']} {values['operation']}" if 'service' in values else " ".join(values.values())
+                errors = int(counter(errors_name, labels)) if errors_name else 0
+                coalesced = int(counter("mcp_tool_coalesced_total", labels)) if metric == "mcp_tool_duration_seconds" else 0
+                rows.append(f"  {label:<40} {histogram['count']:>6} chamadas  "
+                            f"média {histogram['sum'] / histogram['count'] * 1000:8.1f} ms  "
+                            f"p95 ≤ {self._percentile(histogram, 0.95) * 1000:8.1f} ms  "
+                            f"erros {errors}" + (f"  agrupadas {coalesced}" if coalesced else ""))
+            if rows:
+                sections.append(f"{title}:\n" + "\n".join(rows))
+
+        caches = sorted({labels for (name, labels) in counters
+                         if name in ("mcp_cache_hits_total", "mcp_cache_misses_total")})
+        if caches:
+            rows = []
+            for labels in caches:
+                hits = counter("mcp_cache_hits_total", labels)
+                misses = counter("mcp_cache_misses_total", labels)
+                rows.append(f"  {' '.join(v for _, v in labels):<40} {hits / (hits + misses) * 100:5.1f}% acertos "
+                            f"({int(hits)}/{int(hits + misses)})")
+            sections.append("Caches:\n" + "\n".join(rows))
+
+        models = sorted({labels for (name, labels) in counters
+                         if name in ("mcp_llm_prompt_tokens_total", "mcp_llm_completion_tokens_total")})
+        if models:
+            rows = [f"  {' '.join(v for _, v in labels):<40} prompt {int(counter('mcp_llm_prompt_tokens_total', labels))}  "
+                    f"geração {int(counter('mcp_llm_completion_tokens_total', labels))}"
+                    for labels in models]
+            sections.append("Tokens do modelo:\n" + "\n".join(rows))
+        return "\n\n".join(sections)
+
+REGISTRY = MetricsRegistry()
+
+@contextmanager
+def external_call(service: str, operation: str):
+    """Time a call to an external service (github, ollama, chromadb, git)"""
+    start = time.perf_counter()
+    try:
+        with span(f"{service}.{operation}", service):
+            yield
+    except Exception:
+        REGISTRY.inc("mcp_external_errors_total", service=service, operation=operation)
+        raise
+    finally:
+        REGISTRY.observe("mcp_external_duration_seconds", time.perf_counter() - start,
+                         service=service, operation=operation)
+
+def record_cache(cache: str, hit: bool) -> None:
+    """Count a cache lookup"""
+    REGISTRY.inc("mcp_cache_hits_total" if hit else "mcp_cache_misses_total", cache=cache)
+
+def record_llm_usage(model: str, response) -> None:
+    """Count prompt and generated tokens reported by an Ollama chat response"""
+    try:
+        prompt_tokens = response.get('prompt_eval_count') or 0
+        completion_tokens = response.get('eval_count') or 0
+    except AttributeError:
+        return
+    if prompt_tokens:
+        REGISTRY.inc("mcp_llm_prompt_tokens_total", prompt_tokens, model=model)
+    if completion_tokens:
+        REGISTRY.inc("mcp_llm_completion_tokens_total", completion_tokens, model=model)
+
+def instrument_tool(func: Callable) -> Callable:
+    """Wrap an async tool to record its latency and exceptions"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            REGISTRY.inc("mcp_tool_errors_total", tool=name)
+            raise
+        finally:
+            REGISTRY.observe("mcp_tool_duration_seconds", time.perf_counter() - start, tool=name)
+    return wrapper
@@ -0,0 +1,173 @@
+import contextvars
+import cProfile
+import functools
+import itertools
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from .config import load_agent_config
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = "logs/profiles"
+# Herdada pelos processos dos workers para que também gravem perfis
+PROFILE_ENV_VAR = "MCP_DEV_AGENT_PROFILE"
+
+_enabled = os.environ.get(PROFILE_ENV_VAR) == "1"
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+_current_stack: contextvars.ContextVar = contextvars.ContextVar("current_stack", default=())
+# Apenas um cProfile pode estar ativo por vez; chamadas concorrentes gravam só o trace
+_profiler_lock = threading.Lock()
+_sequence = itertools.count(1)
+
+def set_enabled(enabled: bool) -> None:
+    """Turn profiling on or off for this process and the workers it starts"""
+    global _enabled
+    _enabled = enabled
+    if enabled:
+        os.environ[PROFILE_ENV_VAR] = "1"
+    else:
+        os.environ.pop(PROFILE_ENV_VAR, None)
+
+def is_enabled() -> bool:
+    return _enabled
+
+class Trace:
+    """Spans recorded while running one command or tool call"""
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+        self.spans: List[Dict] = []
+        self.files: List[Path] = []
+        self._threads: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, category: str, stack: tuple, start: float, duration: float) -> None:
+        with self._lock:
+            tid = self._threads.setdefault(threading.get_ident(), len(self._threads) + 1)
+            self.spans.append({"name": name, "category": category, "stack": stack,
+                               "start": start, "duration": duration, "tid": tid})
+
+    def chrome_trace(self) -> Dict:
+        """Trace Event Format, readable by Perfetto, chrome://tracing and speedscope"""
+        events = [{
+            "name": span["name"],
+            "cat": span["category"],
+            "ph": "X",
+            "ts": round((span["start"] - self.start) * 1e6),
+            "dur": round(span["duration"] * 1e6),
+            "pid": os.getpid(),
+            "tid": span["tid"],
+        } for span in self.spans]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def folded_stacks(self) -> str:
+        """Collapsed stacks with self time in microseconds, for flamegraph.pl and inferno"""
+        children: Dict[tuple, float] = {}
+        for span in self.spans:
+            parent = span["stack"][:-1]
+            children[parent] = children.get(parent, 0) + span["duration"]
+        totals: Dict[tuple, float] = {}
+        for span in self.spans:
+            own = max(span["duration"] - children.get(span["stack"], 0), 0)
+            totals[span["stack"]] = totals.get(span["stack"], 0) + own
+        return "".join(f"{';'.join(stack)} {round(value * 1e6)}\n"
+                       for stack, value in sorted(totals.items()) if value > 0)
+
+@contextmanager
+def span(name: str, category: str = "call"):
+    """Record a span in the active trace, if any"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    stack = _current_stack.get() + (name,)
+    token = _current_stack.set(stack)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, category, stack, start, time.perf_counter() - start)
+        _current_stack.reset(token)
+
+def output_directory() -> Path:
+    """Directory where profiles are written (`profiling.directory` in .agent.json)"""
+    return Path(load_agent_config().get('profiling', {}).get('directory', DEFAULT_PROFILE_DIR))
+
+def _write(trace: Trace, profiler: Optional[cProfile.Profile]) -> None:
+    slug = re.sub(r'[^A-Za-z0-9_-]+', '_', trace.name)[:60]
+    base = output_directory() / f"{time.strftime('%Y%m%d-%H%M%S')}-{trace.kind}-{slug}-{os.getpid()}-{next(_sequence)}"
+    try:
+        base.parent.mkdir(parents=True, exist_ok=True)
+        if profiler is not None:
+            path = base.parent / f"{base.name}.prof"
+            profiler.dump_stats(str(path))
+            trace.files.append(path)
+        path = base.parent / f"{base.name}.trace.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(trace.chrome_trace(), f)
+        trace.files.append(path)
+        path = base.parent / f"{base.name}.folded"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(trace.folded_stacks())
+        trace.files.append(path)
+    except OSError as e:
+        logger.warning(f"Could not write profile {base}: {e}")
+
+@contextmanager
+def profile(kind: str, name: str):
+    """Profile a command or tool call when profiling is enabled.
+
+    Yields the Trace (or None when disabled); its `files` list holds the
+    written .prof, .trace.json and .folded files once the block exits.
+    """
+    if not _enabled or _current_trace.get() is not None:
+        yield None
+        return
+
+    trace = Trace(kind, name)
+    trace_token = _current_trace.set(trace)
+    profiler = None
+    if _profiler_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Outro profiler já ativo no processo
+            profiler = None
+            _profiler_lock.release()
+    try:
+        with span(name, kind):
+            yield trace
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            _profiler_lock.release()
+        _current_trace.reset(trace_token)
+        _write(trace, profiler)
+        logger.info(f"Profile of {kind} {name} written to {', '.join(map(str, trace.files))}")
+
+def profile_tool(func: Callable) -> Callable:
+    """Wrap an async tool so each call is profiled when profiling is enabled"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        with profile("tool", func.__name__):
+            return await func(*args, **kwargs)
+    return wrapper
+
+def propagate(func: Callable) -> Callable:
+    """Run func in a copy of the caller's context so executor threads record into the active trace"""
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
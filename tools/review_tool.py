@@ -0,0 +1,232 @@
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .cache import DiskCache, content_hash
+from .code_chunker import estimate_tokens, find_definitions
+from .config import get_context_window
+from .git_tool import GitTool
+from .metrics import external_call, record_llm_usage
+from .profiling import propagate
+
+logger = logging.getLogger(__name__)
+
+# Linhas de contexto ao redor de hunks fora de funções/classes
+CONTEXT_LINES = 3
+RESPONSE_TOKEN_RESERVE = 1024
+MAX_CONCURRENT_REVIEWS = 4
+REVIEW_PROMPT_VERSION = "1"
+
+LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+}
+
+REVIEW_PROMPT = """You are a senior code reviewer. Review ONLY the changes shown in the diff below.
+Point out bugs, regressions, security problems and readability issues introduced by the change.
+Reference line numbers from the code region. If the change looks correct, say so briefly.
+
+File: {path}
+Code region after the change (lines {start}-{end}):
+{region}
+
+Diff of the change:
+{diff}
+"""
+
+_HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@')
+
+def parse_unified_diff(diff_text: str) -> List[Dict]:
+    """Parse `git diff -U0` output into a list of files with their hunks.
+
+    Hunk line numbers refer to the new version of the file.
+    """
+    files = []
+    current = None
+    hunk = None
+    for line in diff_text.split('\n'):
+        if line.startswith('diff --git '):
+            current = {"path": None, "deleted": False, "binary": False, "hunks": []}
+            files.append(current)
+            hunk = None
+        elif current is None:
+            continue
+        elif hunk is not None and line[:1] in ('+', '-', ' ', '\\'):
+            hunk["lines"].append(line)
+        elif line.startswith('+++ '):
+            target = line[4:]
+            if target == '/dev/null':
+                current["deleted"] = True
+            else:
+                current["path"] = target[2:] if target.startswith('b/') else target
+        elif line.startswith('--- '):
+            source = line[4:]
+            if current["path"] is None and source != '/dev/null':
+                current["path"] = source[2:] if source.startswith('a/') else source
+        elif line.startswith('Binary files '):
+            current["binary"] = True
+        elif line.startswith('@@'):
+            match = _HUNK_HEADER.match(line)
+            if not match:
+                continue
+            start = int(match.group(3))
+            count = int(match.group(4)) if match.group(4) is not None else 1
+            hunk = {"start_line": start, "line_count": count, "lines": [line]}
+            current["hunks"].append(hunk)
+    return [f for f in files if f["path"]]
+
+def _number_lines(lines: List[str], start: int, end: int) -> str:
+    return '\n'.join(f"{number:>5} | {lines[number - 1]}" for number in range(start, end + 1))
+
+def _hunks_diff(hunks: List[Dict]) -> str:
+    return '\n'.join('\n'.join(hunk["lines"]) for hunk in hunks)
+
+def _prompt_tokens(lines: List[str], start: int, end: int, hunks: List[Dict]) -> int:
+    """Tokens a region adds to the prompt: its numbered code plus the diff of its hunks"""
+    return estimate_tokens(_number_lines(lines, start, end)) + estimate_tokens(_hunks_diff(hunks))
+
+class ReviewTool:
+    def __init__(self):
+        self.git = GitTool()
+        self.model = "codellama" # Default model for code review
+        self.cache = DiskCache("diff_review")
+
+    def _diff_args(self, scope: str, commit_range: Optional[str]) -> List[str]:
+        if commit_range:
+            return [commit_range]
+        if scope == 'staged':
+            return ['--cached']
+        if scope == 'unstaged':
+            return []
+        return ['HEAD']
+
+    def _read_new_content(self, path: str, scope: str, commit_range: Optional[str]) -> Optional[str]:
+        """Read the post-change version of a file for the given scope"""
+        repo = self.git.repo
+        try:
+            if commit_range:
+                target = commit_range.split('..')[-1].lstrip('.') or 'HEAD'
+                return repo.git.show(f"{target}:{path}")
+            if scope == 'staged':
+                return repo.git.show(f":{path}")
+            with open(os.path.join(repo.working_tree_dir, path), 'r', encoding='utf-8') as f:
+                return f.read()
+        except Exception as e:
+            logger.warning(f"Could not read new content of {path}: {e}")
+            return None
+
+    def collect_regions(self, scope: str = "all", commit_range: Optional[str] = None) -> List[Dict]:
+        """Map changed hunks to the enclosing functions/classes of the new file version"""
+        with external_call("git", "diff"):
+            diff_text = self.git.repo.git.diff(*self._diff_args(scope, commit_range),
+                                               '-U0', '--no-color', '--no-ext-diff')
+        budget = get_context_window(self.model) - RESPONSE_TOKEN_RESERVE - estimate_tokens(REVIEW_PROMPT)
+        regions = []
+        for changed in parse_unified_diff(diff_text):
+            if changed["deleted"] or changed["binary"] or not changed["hunks"]:
+                continue
+            content = self._read_new_content(changed["path"], scope, commit_range)
+            if content is None:
+                continue
+            lines = content.split('\n')
+            language = LANGUAGES.get(os.path.splitext(changed["path"])[1])
+            definitions = find_definitions(lines, language)
+
+            file_regions = []
+            for hunk in changed["hunks"]:
+                first = max(hunk["start_line"], 1)
+                last = max(first + hunk["line_count"] - 1, first)
+                overlapping = [d for d in definitions if d["start_line"] <= last and d["end_line"] >= first]
+                # Só as definições mais internas: um método alterado vai sem o resto da classe
+                enclosing = [d for d in overlapping
+                             if not any(other is not d and d["start_line"] <= other["start_line"]
+                                        and other["end_line"] <= d["end_line"] for other in overlapping)]
+                if enclosing:
+                    start = min(enclosing[0]["start_line"], first)
+                    end = max(enclosing[-1]["end_line"], last)
+                    names = [d["name"] for d in enclosing]
+                else:
+                    start, end, names = first - CONTEXT_LINES, last + CONTEXT_LINES, []
+                start, end = max(start, 1), min(end, len(lines))
+                if _prompt_tokens(lines, start, end, [hunk]) > budget:
+                    # Função grande demais: enviar apenas o hunk com contexto mínimo
+                    start, end = max(first - CONTEXT_LINES, 1), min(last + CONTEXT_LINES, len(lines))
+                    names = []
+
+                previous = file_regions[-1] if file_regions else None
+                merged_end = max(previous["end_line"], end) if previous else end
+                # Regiões unidas só se o resultado ainda couber no orçamento
+                if (previous and start <= previous["end_line"] and
+                        _prompt_tokens(lines, previous["start_line"], merged_end,
+                                       previous["hunks"] + [hunk]) <= budget):
+                    previous["end_line"] = merged_end
+                    previous["hunks"].append(hunk)
+                    previous["names"].extend(n for n in names if n not in previous["names"])
+                else:
+                    file_regions.append({"path": changed["path"], "start_line": start, "end_line": end,
+                                         "names": names, "hunks": [hunk]})
+
+            for region in file_regions:
+                region["code"] = _number_lines(lines, region["start_line"], region["end_line"])
+                region["diff"] = _hunks_diff(region["hunks"])
+            regions.extend(file_regions)
+        return regions
+
+    def review_region(self, region: Dict) -> str:
+        """Review one changed region, reusing cached reviews for identical hunks"""
+        import ollama
+
+        key = content_hash(REVIEW_PROMPT_VERSION, self.model, region["path"], region["diff"], region["code"])
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        prompt = REVIEW_PROMPT.format(path=region["path"], start=region["start_line"],
+                                      end=region["end_line"], region=region["code"], diff=region["diff"])
+        with external_call("ollama", "chat"):
+            response = ollama.chat(
+                model=self.model,
+                messages=[{
+                    'role': 'user',
+                    'content': prompt
+                }],
+                options={'num_ctx': get_context_window(self.model)},
+                stream=False
+            )
+        record_llm_usage(self.model, response)
+        result = response['message']['content'].strip()
+        self.cache.set(key, result)
+        return result
+
+async def review_changes(scope: str = "all", commit_range: Optional[str] = None) -> str:
+    """Review only the changed hunks (staged, unstaged, all or a commit range) using the local AI model"""
+    try:
+        tool = ReviewTool()
+        if not tool.git.repo:
+            return "Nenhum repositório git encontrado"
+        if scope not in ('all', 'staged', 'unstaged'):
+            return "Escopo inválido. Use: all, staged ou unstaged"
+
+        regions = tool.collect_regions(scope, commit_range)
+        if not regions:
+            return "Nenhuma mudança para revisar"
+
+        print(f"🤖 Revisando {len(regions)} trecho(s) alterado(s)...")
+        with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_REVIEWS, len(regions))) as executor:
+            reviews = list(executor.map(propagate(tool.review_region), regions))
+        print("✅ Revisão concluída!")
+
+        result = []
+        for region, review in zip(regions, reviews):
+            names = f" ({', '.join(region['names'])})" if region['names'] else ""
+            result.append(f"""📄 {region['path']} linhas {region['start_line']}-{region['end_line']}{names}
+{review}""")
+        return "\n---\n".join(result)
+    except Exception as e:
+        logger.error(f"Error reviewing changes: {e}")
+        return f"Erro ao revisar mudanças: {str(e)}"
@@ -0,0 +1,63 @@
+import asyncio
+import functools
+import inspect
+import json
+import logging
+from typing import Callable, Dict
+
+from .metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+class SingleFlight:
+    """Coalesce identical concurrent tool calls into a single execution.
+
+    Calls with the same tool name and arguments that arrive while a previous
+    one is still running await that execution and share its result (or
+    exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, name: str, field: str) -> None:
+        stats = self._stats.setdefault(name, {"calls": 0, "executions": 0, "coalesced": 0})
+        stats[field] += 1
+
+    def _forget(self, key: str, future: asyncio.Future) -> None:
+        if self._in_flight.get(key) is future:
+            del self._in_flight[key]
+
+    async def do(self, name: str, key: str, factory: Callable):
+        """Run factory() once per key among concurrent callers"""
+        self._count(name, "calls")
+        future = self._in_flight.get(key)
+        if future is not None:
+            self._count(name, "coalesced")
+            REGISTRY.inc("mcp_tool_coalesced_total", tool=name)
+            logger.info(f"Coalesced concurrent call to {name}")
+        else:
+            self._count(name, "executions")
+            future = asyncio.ensure_future(factory())
+            self._in_flight[key] = future
+            future.add_done_callback(functools.partial(self._forget, key))
+        # shield: cancelar um chamador não cancela a execução compartilhada
+        return await asyncio.shield(future)
+
+    def wrap(self, func: Callable) -> Callable:
+        """Wrap an async tool so identical concurrent calls are coalesced"""
+        signature = inspect.signature(func)
+        name = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = name + ':' + json.dumps(bound.arguments, sort_keys=True, default=str)
+            return await self.do(name, key, lambda: func(*args, **kwargs))
+        return wrapper
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Per-tool counts of calls, real executions and coalesced calls"""
+        return {name: dict(counts) for name, counts in self._stats.items()}
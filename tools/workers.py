@@ -0,0 +1,124 @@
+import asyncio
+import functools
+import importlib
+import logging
+import multiprocessing
+import threading
+from typing import Callable, Dict, Optional, Set
+
+from .logging_config import configure_worker_logging, start_process_listener
+from .metrics import REGISTRY
+from .profiling import profile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRAIN_TIMEOUT = 30
+
+def _run_tool(module_name: str, func_name: str, args: tuple, kwargs: Dict):
+    """Entry point in the worker process: run an async tool to completion.
+
+    Returns (result, error, metrics) so the metrics recorded in the worker
+    reach the server process even when the tool fails.
+    """
+    try:
+        module = importlib.import_module(module_name)
+        func = getattr(module, func_name)
+        with profile("tool", func_name):
+            result, error = asyncio.run(func(*args, **kwargs)), None
+    except Exception as e:
+        result, error = None, e
+    return result, error, REGISTRY.drain()
+
+class WorkerPool:
+    """Process pool that runs tool calls outside the server event loop.
+
+    Tools are looked up by module and name inside each worker, so only the
+    call arguments and results cross process boundaries. Worker log records
+    are sent back and written by the parent's logging handlers.
+    """
+
+    def __init__(self, workers: int, log_settings: Optional[Dict] = None):
+        self.workers = workers
+        context = multiprocessing.get_context('spawn')
+        self.log_queue, self.log_listener = start_process_listener(context)
+        self.pool = context.Pool(processes=workers, initializer=configure_worker_logging,
+                                 initargs=(self.log_queue, log_settings or {}))
+        self.draining = False
+        self.closed = False
+        self._in_flight: Set[asyncio.Future] = set()
+        self._lock = threading.Lock()
+
+    async def call(self, func: Callable, *args, **kwargs):
+        """Run func(*args, **kwargs) in a worker and await its result"""
+        if self.draining:
+            raise RuntimeError("Server is shutting down, try again later")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve(setter, value):
+            if not future.done():
+                setter(value)
+
+        def forget(done: asyncio.Future):
+            with self._lock:
+                self._in_flight.discard(done)
+
+        # A chamada continua em andamento no worker mesmo se quem aguarda for
+        # cancelado; drain() espera por ela até o timeout
+        with self._lock:
+            self._in_flight.add(future)
+        future.add_done_callback(forget)
+        self.pool.apply_async(
+            _run_tool, (func.__module__, func.__name__, args, kwargs),
+            callback=lambda value: loop.call_soon_threadsafe(resolve, future.set_result, value),
+            error_callback=lambda error: loop.call_soon_threadsafe(resolve, future.set_exception, error)
+        )
+        value, error, metrics = await asyncio.shield(future)
+        REGISTRY.merge(metrics)
+        if error is not None:
+            raise error
+        return value
+
+    def wrap(self, func: Callable) -> Callable:
+        """Wrap an async tool so it is executed by the pool, keeping its signature"""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await self.call(func, *args, **kwargs)
+        return wrapper
+
+    async def wait_in_flight(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> Set[asyncio.Future]:
+        """Stop accepting calls and wait up to timeout for running ones; returns those still running.
+
+        Must run on the server event loop while client connections are still
+        open, so finished calls can deliver their results.
+        """
+        self.draining = True
+        with self._lock:
+            pending = list(self._in_flight)
+        if not pending:
+            return set()
+        logger.info(f"Draining {len(pending)} in-flight tool calls")
+        _, unfinished = await asyncio.wait(pending, timeout=timeout)
+        return unfinished
+
+    async def drain(self, timeout: float = DEFAULT_DRAIN_TIMEOUT) -> None:
+        """Stop accepting calls, wait for running ones up to timeout and stop the workers"""
+        unfinished = await self.wait_in_flight(timeout)
+        if unfinished:
+            logger.warning(f"Terminating workers with {len(unfinished)} unfinished tool calls")
+        await asyncio.to_thread(self.close, bool(unfinished))
+
+    def close(self, terminate: bool = True) -> None:
+        """Stop the worker processes (terminating running calls) and the log listener"""
+        if self.closed:
+            return
+        self.closed = True
+        self.draining = True
+        if terminate:
+            self.pool.terminate()
+        else:
+            self.pool.close()
+        self.pool.join()
+        if self.log_listener:
+            self.log_listener.stop()